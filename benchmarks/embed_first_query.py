@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+First-query embedding latency of a fresh process, with and without the daemon.
+
+    python -m benchmarks.embed_first_query            # starts a daemon on a temp socket
+    python -m benchmarks.embed_first_query --fake     # daemon serves fake vectors (no model download)
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CHILD = """
+import time
+t0 = time.perf_counter()
+from second_brain_chat.embeddings import get_embeddings
+get_embeddings({backend!r}).embed_query("what are my main themes?")
+print(time.perf_counter() - t0)
+"""
+
+def fresh_process(backend: str, socket_path: str) -> float:
+    env = dict(os.environ, EMBED_SOCKET=socket_path)
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD.format(backend=backend)],
+                         env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    print(f"  import + first query {float(out.stdout.strip()) * 1000:8.1f} ms   (process wall {wall:.2f}s)")
+    return wall
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--fake", action="store_true", help="Serve fake vectors instead of loading the model")
+    p.add_argument("--runs", type=int, default=3)
+    args = p.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "embed.sock")
+    if not args.fake:
+        print("in-process model (no daemon):")
+        for _ in range(args.runs):
+            fresh_process("local", socket_path)
+
+    from second_brain_chat.embed_daemon import EmbeddingServer
+    if args.fake:
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        embedder = DeterministicFakeEmbedding(size=384)
+    else:
+        from second_brain_chat.embeddings import local_embeddings
+        embedder = local_embeddings()
+        embedder.embed_documents(["warm-up"])
+    server = EmbeddingServer(socket_path, embedder)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print("daemon client:")
+    try:
+        for _ in range(args.runs):
+            fresh_process("daemon", socket_path)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
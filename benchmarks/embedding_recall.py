@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Retrieval recall and speed of the hashing embeddings against the MiniLM model.
+
+Every node title is a probe query; a hit is a top-k chunk that has the title as a heading.
+
+    python -m benchmarks.embedding_recall                       # generated map
+    python -m benchmarks.embedding_recall my_map.mm -k 5
+    python -m benchmarks.embedding_recall --backends hashing    # skip the model
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_community.vectorstores import Chroma
+
+from second_brain_chat.autotune import node_titles, relevant_chunks
+from second_brain_chat.embeddings import get_embeddings
+from second_brain_chat.freeplane_parser import parse_and_chunk
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mapgen import write_map
+
+def make_embeddings(name: str, chunks):
+    if name == "hashing":
+        return HashingEmbeddings().fit(chunks)
+    if name == "hashing-tf":
+        return HashingEmbeddings()
+    return get_embeddings(name)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("file", nargs="?", help="Path to .mm mindmap (default: a generated one)")
+    p.add_argument("--backends", nargs="+", default=["hashing", "hashing-tf", "local"],
+                   help="hashing (TF-IDF), hashing-tf (no IDF) or any get_embeddings backend")
+    p.add_argument("--max-tokens", type=int, default=500)
+    p.add_argument("-k", type=int, default=5)
+    p.add_argument("--branches", type=int, default=12, help="Generated map: top-level branches")
+    p.add_argument("--depth", type=int, default=3, help="Generated map: depth per branch")
+    args = p.parse_args()
+
+    path = args.file or write_map(os.path.join(tempfile.mkdtemp(), "generated.mm"),
+                                  branches=args.branches, depth=args.depth)
+    root, chunks = parse_and_chunk(path, max_tokens=args.max_tokens, profile="lean")
+    probes = [(title, relevant_chunks(title, chunks)) for title in node_titles(root)]
+    probes = [(title, relevant) for title, relevant in probes if relevant]
+    print(f"{len(chunks)} chunks, {len(probes)} probe queries, k={args.k}")
+
+    print(f"{'backend':<11} {'startup ms':>10} {'index s':>8} {'query ms':>9} {'recall@1':>9} {'recall@k':>9}")
+    for name in args.backends:
+        t0 = time.perf_counter()
+        embedder = make_embeddings(name, chunks)
+        embedder.embed_query("warm-up")
+        startup = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        store = Chroma(collection_name=f"recall-{name}", embedding_function=embedder)
+        store.add_texts(chunks, metadatas=[{"chunk": i} for i in range(len(chunks))])
+        index_s = time.perf_counter() - t0
+
+        hits1 = hitsk = 0
+        t0 = time.perf_counter()
+        for title, relevant in probes:
+            found = [d.metadata["chunk"] for d in store.similarity_search(title, k=args.k)]
+            hits1 += bool(found[:1] and found[0] in relevant)
+            hitsk += bool(relevant.intersection(found))
+        query_ms = (time.perf_counter() - t0) / len(probes) * 1000
+        store.delete_collection()
+
+        print(f"{name:<11} {startup * 1000:>10.1f} {index_s:>8.2f} {query_ms:>9.2f} "
+              f"{hits1 / len(probes):>9.3f} {hitsk / len(probes):>9.3f}")
+
+if __name__ == "__main__":
+    main()
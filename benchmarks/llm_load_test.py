@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Load test for the shared LLM client against a local stub OpenAI-compatible server.
+
+    python -m benchmarks.llm_load_test --clients 32 --requests 8 --latency 0.05
+
+The stub counts concurrent generations and TCP connections, so the report shows
+whether the in-flight limit holds and whether connections are reused.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.connections = 0
+        self.requests = 0
+
+def make_handler(stats: StubStats, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def setup(self):
+            super().setup()
+            with stats.lock:
+                stats.connections += 1
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self._send({"data": []})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with stats.lock:
+                stats.active += 1
+                stats.requests += 1
+                stats.peak = max(stats.peak, stats.active)
+            time.sleep(latency)  # pretend to generate
+            with stats.lock:
+                stats.active -= 1
+            self._send({
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "stub reply"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+            })
+
+        def _send(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+def run(clients: int, requests_per_client: int, latency: float, unbounded: bool):
+    stats = StubStats()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(stats, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    from langchain_openai import ChatOpenAI
+    from second_brain_chat.llm_client import get_llm, bounded, MAX_IN_FLIGHT
+
+    if unbounded:
+        # the old behaviour: a fresh client per caller, no limit, openai's own retries
+        def call(_):
+            llm = ChatOpenAI(base_url=base_url, api_key="x", model_name="stub")
+            return llm.invoke("hello")
+    else:
+        chain = bounded(get_llm(base_url=base_url, streaming=False, model_name="stub"))
+        def call(_):
+            return chain.invoke("hello")
+
+    latencies = []
+    def client(_):
+        for _ in range(requests_per_client):
+            t0 = time.perf_counter()
+            call(None)
+            latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies.sort()
+    print(f"mode: {'unbounded' if unbounded else f'bounded (max in flight {MAX_IN_FLIGHT})'}")
+    print(f"requests: {stats.requests} in {elapsed:.2f}s -> {stats.requests / elapsed:.1f} req/s")
+    print(f"peak concurrent generations at server: {stats.peak}")
+    print(f"TCP connections opened: {stats.connections}")
+    print(f"latency p50 {statistics.median(latencies) * 1000:.0f}ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms")
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--clients", type=int, default=32)
+    p.add_argument("--requests", type=int, default=8, help="Requests per client")
+    p.add_argument("--latency", type=float, default=0.05, help="Stub generation time in seconds")
+    p.add_argument("--unbounded", action="store_true", help="Bypass the shared client for comparison")
+    args = p.parse_args()
+    run(args.clients, args.requests, args.latency, args.unbounded)
+
+if __name__ == "__main__":
+    main()
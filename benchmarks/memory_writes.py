@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Per-turn write latency and commit throughput of the durable memory store,
+against the old synchronous Chroma.add_texts path.
+
+    python -m benchmarks.memory_writes --turns 500 --batch-sizes 1 8 32 128
+    python -m benchmarks.memory_writes --fake-embeddings   # isolate store cost from the model
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import Chroma
+
+from second_brain_chat.embeddings import get_embeddings
+from second_brain_chat.memory_store import DurableMemoryStore
+
+def _report(label: str, latencies, total_s: float, turns: int):
+    latencies = sorted(latencies)
+    print(f"{label:<22} p50 {statistics.median(latencies) * 1000:7.3f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.3f} ms  "
+          f"throughput {turns / total_s:8.1f} turns/s")
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--turns", type=int, default=500)
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    p.add_argument("--no-fsync", action="store_true")
+    p.add_argument("--fake-embeddings", action="store_true")
+    args = p.parse_args()
+
+    embedding = DeterministicFakeEmbedding(size=384) if args.fake_embeddings else get_embeddings()
+    texts = [f"turn {i}: what did I write about project {i % 37} and habit {i % 11}?" for i in range(args.turns)]
+
+    store = Chroma(embedding_function=embedding, persist_directory=tempfile.mkdtemp())
+    latencies = []
+    t0 = time.perf_counter()
+    for text in texts:
+        s = time.perf_counter()
+        store.add_texts([text])
+        latencies.append(time.perf_counter() - s)
+    _report("sync add_texts", latencies, time.perf_counter() - t0, args.turns)
+
+    for batch_size in args.batch_sizes:
+        memory = DurableMemoryStore(tempfile.mkdtemp(), embedding, batch_size=batch_size,
+                                    flush_interval=0.05, fsync=not args.no_fsync)
+        latencies = []
+        t0 = time.perf_counter()
+        for text in texts:
+            s = time.perf_counter()
+            memory.add_texts([text])
+            latencies.append(time.perf_counter() - s)
+        memory.flush()  # throughput counts until everything is searchable
+        _report(f"durable batch={batch_size}", latencies, time.perf_counter() - t0, args.turns)
+        memory.close()
+
+if __name__ == "__main__":
+    main()
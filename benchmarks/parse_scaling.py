@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Parse + chunk time versus worker count, checked against the serial output.
+
+    python -m benchmarks.parse_scaling                       # generated note-heavy map
+    python -m benchmarks.parse_scaling my_map.mm --workers 1 2 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from second_brain_chat.freeplane_parser import parse_mm, chunk_node, parse_and_chunk
+from second_brain_chat.mapgen import write_map
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("file", nargs="?", help="Path to .mm mindmap (default: a generated one)")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--max-tokens", type=int, default=500)
+    p.add_argument("--profile", default="full")
+    p.add_argument("--branches", type=int, default=32, help="Generated map: top-level branches")
+    p.add_argument("--depth", type=int, default=4, help="Generated map: depth per branch")
+    args = p.parse_args()
+
+    path = args.file or write_map(os.path.join(tempfile.mkdtemp(), "generated.mm"),
+                                  branches=args.branches, depth=args.depth,
+                                  note_ratio=0.6, note_words=120)
+    print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    t0 = time.perf_counter()
+    root = parse_mm(path)
+    chunks = chunk_node(root, max_tokens=args.max_tokens, profile=args.profile)
+    baseline = time.perf_counter() - t0
+    print(f"{'serial':>8} {baseline:8.2f}s  {len(chunks)} chunks")
+
+    for n in args.workers:
+        t0 = time.perf_counter()
+        par_root, par_chunks = parse_and_chunk(path, max_tokens=args.max_tokens,
+                                               profile=args.profile, workers=n)
+        elapsed = time.perf_counter() - t0
+        same = par_root == root and par_chunks == chunks
+        print(f"{n:>5} wk {elapsed:8.2f}s  x{baseline / elapsed:4.2f}  identical={same}")
+
+if __name__ == "__main__":
+    main()
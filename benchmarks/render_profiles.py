@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tokens, chunks and indexing time per render profile.
+
+    python -m benchmarks.render_profiles                 # generated map
+    python -m benchmarks.render_profiles my_map.mm --max-tokens 500
+    python -m benchmarks.render_profiles --no-index      # skip the embedding step
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from second_brain_chat.freeplane_parser import parse_mm, chunk_node, node_to_markdown, count_tokens, RENDER_PROFILES
+from second_brain_chat.mapgen import write_map
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("file", nargs="?", help="Path to .mm mindmap (default: a generated one)")
+    p.add_argument("--max-tokens", type=int, default=500)
+    p.add_argument("--branches", type=int, default=12, help="Generated map: top-level branches")
+    p.add_argument("--depth", type=int, default=3, help="Generated map: depth per branch")
+    p.add_argument("--no-index", action="store_true", help="Only measure tokens and chunks")
+    args = p.parse_args()
+
+    path = args.file
+    if path is None:
+        path = write_map(os.path.join(tempfile.mkdtemp(), "generated.mm"),
+                         branches=args.branches, depth=args.depth)
+    root = parse_mm(path)
+
+    print(f"{'profile':<10} {'tokens':>9} {'chunks':>7} {'chunk tok':>10} {'index s':>8}")
+    for name in RENDER_PROFILES:
+        total = count_tokens(node_to_markdown(root, profile=name))
+        chunks = chunk_node(root, max_tokens=args.max_tokens, profile=name)
+        chunk_tokens = sum(count_tokens(c) for c in chunks)
+        index_s = float("nan")
+        if not args.no_index:
+            from second_brain_chat.index import index_chunks
+            t0 = time.perf_counter()
+            store = index_chunks(chunks, metadata={"source": os.path.basename(path)}, profile=name)
+            index_s = time.perf_counter() - t0
+            store.delete_collection()
+        print(f"{name:<10} {total:>9} {len(chunks):>7} {chunk_tokens:>10} {index_s:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Build time and query latency of the sharded index versus shard count.
+
+    python -m benchmarks.shard_scaling --maps 8 --branches 20 --shards 1 2 4 8
+    python -m benchmarks.shard_scaling --fake-embeddings   # isolate index/IO cost from the model
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from second_brain_chat.mapgen import write_map, WORDS
+from second_brain_chat.shards import build_sharded_index
+
+def fake_embeddings():
+    return DeterministicFakeEmbedding(size=384)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--maps", type=int, default=8, help="Number of generated maps")
+    p.add_argument("--branches", type=int, default=20, help="Top-level branches per map")
+    p.add_argument("--depth", type=int, default=3)
+    p.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--by", choices=["source", "hash"], default="hash")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("-k", type=int, default=5)
+    p.add_argument("--fake-embeddings", action="store_true")
+    args = p.parse_args()
+
+    work = tempfile.mkdtemp(prefix="shard_bench_")
+    maps = [write_map(os.path.join(work, f"map_{i}.mm"), branches=args.branches, depth=args.depth, seed=i)
+            for i in range(args.maps)]
+    factory = fake_embeddings if args.fake_embeddings else None  # None: $EMBED_BACKEND
+    rng = random.Random(0)
+    queries = [" ".join(rng.choice(WORDS) for _ in range(4)) for _ in range(args.queries)]
+
+    print(f"{args.maps} maps, {os.cpu_count()} CPUs, partition by {args.by}")
+    print(f"{'shards':>6} {'chunks':>7} {'build s':>8} {'q p50 ms':>9} {'q p95 ms':>9}")
+    for n in args.shards:
+        db = os.path.join(work, f"db_{n}")
+        t0 = time.perf_counter()
+        index = build_sharded_index(maps, db, n_shards=n, by=args.by, workers=n, embedding_factory=factory)
+        build_s = time.perf_counter() - t0
+        chunks = sum(s._collection.count() for s in index.stores)
+
+        # embed up front so the numbers show search + merge, not the model
+        vectors = index.embeddings.embed_documents(queries)
+        latencies = []
+        for v in vectors:
+            t0 = time.perf_counter()
+            index.similarity_search_by_vector_with_score(v, k=args.k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        latencies.sort()
+        print(f"{n:>6} {chunks:>7} {build_s:>8.2f} {statistics.median(latencies):>9.2f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1]:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Chunk-size autotuner.
+
+Sweeps chunk_node settings (max_tokens x render profile) over a map and scores each
+with node titles as probe queries: a probe is answered if a top-k chunk has the title
+as a heading. Per setting it measures build time, vector count, search latency,
+recall@k and the average number of context tokens the top-k would put in a prompt.
+
+The recommendation is the setting with the fewest context tokens among those whose
+recall is within `tolerance` of the best. It is written to the index's manifest.json
+(as autotune.recommended; "chunking" keeps describing the index as built), where the
+next build_index or build_sharded_index picks it up:
+
+    python -m second_brain_chat.autotune map.mm                   # writes chroma_db_map.mm/manifest.json
+    python -m second_brain_chat.mindmap_chat map.mm --reindex     # builds with the tuned settings
+    python -m second_brain_chat.autotune map.mm --max-tokens 200 400 800 --profiles lean full --build
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Sequence, Set, Tuple
+
+from langchain_community.vectorstores import Chroma
+
+from second_brain_chat.embeddings import BACKENDS, get_embeddings, resolve_backend
+from second_brain_chat.freeplane_parser import Node, chunk_node, count_tokens, get_profile, parse_mm
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mindmap_chat import read_manifest, write_manifest
+
+MAX_TOKENS_GRID = (200, 300, 500, 800, 1000)
+
+@dataclass
+class TrialResult:
+    max_tokens: int
+    profile: str
+    vectors: int
+    build_s: float
+    search_ms: float
+    recall_at_k: float
+    context_tokens: float
+    probes: int
+
+def node_titles(root: Node) -> List[str]:
+    """Titles that occur once in the map (duplicates have no single right answer)."""
+    seen, order = {}, []
+
+    def walk(node: Node) -> None:
+        if node.text:
+            seen[node.text] = seen.get(node.text, 0) + 1
+            order.append(node.text)
+        for child in node.children:
+            walk(child)
+    walk(root)
+    return [t for t in order if seen[t] == 1]
+
+def relevant_chunks(title: str, chunks: Sequence[str]) -> Set[int]:
+    heading = re.compile(rf"^#+ {re.escape(title)}$", re.MULTILINE)
+    return {i for i, chunk in enumerate(chunks) if heading.search(chunk)}
+
+def evaluate(root: Node, titles: Sequence[str], max_tokens: int, profile="lean",
+             k: int = 5, embedder=None) -> TrialResult:
+    """Scores one setting. Pass the same embedder to every trial so model loading isn't timed."""
+    profile = get_profile(profile)
+    embedder = embedder if embedder is not None else get_embeddings()
+    t0 = time.perf_counter()
+    chunks = chunk_node(root, max_tokens=max_tokens, profile=profile)
+    if isinstance(embedder, HashingEmbeddings):
+        # IDF depends on the chunks, so it is part of each build
+        embedder.fit(chunks)
+    # throwaway in-memory collection per trial
+    store = Chroma(collection_name=f"autotune-{uuid.uuid4().hex}", embedding_function=embedder)
+    store.add_texts(chunks, metadatas=[{"chunk": i} for i in range(len(chunks))])
+    build_s = time.perf_counter() - t0
+
+    hits, latencies, context = 0, [], []
+    try:
+        for title in titles:
+            t0 = time.perf_counter()
+            docs = store.similarity_search(title, k=k)
+            latencies.append(time.perf_counter() - t0)
+            hits += bool(relevant_chunks(title, chunks).intersection(d.metadata["chunk"] for d in docs))
+            context.append(sum(count_tokens(d.page_content) for d in docs))
+    finally:
+        store.delete_collection()
+    return TrialResult(
+        max_tokens=max_tokens, profile=profile.name, vectors=len(chunks), build_s=build_s,
+        search_ms=statistics.mean(latencies) * 1000 if latencies else 0.0,
+        recall_at_k=hits / len(titles) if titles else 0.0,
+        context_tokens=statistics.mean(context) if context else 0.0,
+        probes=len(titles),
+    )
+
+def recommend(results: Sequence[TrialResult], tolerance: float = 0.02) -> TrialResult:
+    """Fewest context tokens among the settings within `tolerance` of the best recall."""
+    best_recall = max(r.recall_at_k for r in results)
+    eligible = [r for r in results if r.recall_at_k >= best_recall - tolerance]
+    return min(eligible, key=lambda r: (r.context_tokens, r.vectors, r.max_tokens))
+
+def autotune(mm_path: str, max_tokens_grid: Sequence[int] = MAX_TOKENS_GRID,
+             profiles: Sequence[str] = ("lean",), k: int = 5, probes: Optional[int] = 200,
+             embedding_backend: Optional[str] = None, tolerance: float = 0.02,
+             seed: int = 0) -> Tuple[List[TrialResult], TrialResult]:
+    """Runs the sweep; `probes` caps the number of title queries (random sample)."""
+    root = parse_mm(mm_path)
+    titles = node_titles(root)
+    if probes is not None and len(titles) > probes:
+        titles = random.Random(seed).sample(titles, probes)
+    if not titles:
+        raise ValueError(f"{mm_path} has no node titles to use as probe queries")
+    embedder = get_embeddings(embedding_backend)
+    embedder.embed_query("warm-up")  # load the model (or connect to the daemon) before timing
+    results = [evaluate(root, titles, max_tokens, profile, k=k, embedder=embedder)
+               for profile in profiles for max_tokens in max_tokens_grid]
+    return results, recommend(results, tolerance)
+
+def write_recommendation(db_dir: str, best: TrialResult, results: Sequence[TrialResult],
+                         k: int, embedding_backend: Optional[str] = None) -> dict:
+    """Stores the recommendation in manifest.json, keeping whatever else the index recorded."""
+    manifest = read_manifest(db_dir)
+    manifest["autotune"] = {
+        "recommended": {"max_tokens": best.max_tokens, "profile": best.profile},
+        "k": k,
+        "probes": best.probes,
+        "embedding_backend": resolve_backend(embedding_backend),
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "trials": [asdict(r) for r in results],
+    }
+    write_manifest(db_dir, manifest)
+    return manifest
+
+def format_results(results: Sequence[TrialResult], best: TrialResult, k: int) -> str:
+    lines = [f"{'max_tokens':>10} {'profile':<9} {'vectors':>7} {'build s':>8} {'search ms':>9} "
+             f"{f'recall@{k}':>9} {'ctx tokens':>10}"]
+    for r in results:
+        mark = "  <- recommended" if r is best else ""
+        lines.append(f"{r.max_tokens:>10} {r.profile:<9} {r.vectors:>7} {r.build_s:>8.2f} {r.search_ms:>9.2f} "
+                     f"{r.recall_at_k:>9.3f} {r.context_tokens:>10.0f}{mark}")
+    return "\n".join(lines)
+
+def main():
+    p = argparse.ArgumentParser(description="Pick chunking settings for a map by retrieval recall and cost")
+    p.add_argument("file", help="Path to .mm mindmap")
+    p.add_argument("--db", default=None, help="Index directory (default: chroma_db_<file name>)")
+    p.add_argument("--max-tokens", type=int, nargs="+", default=list(MAX_TOKENS_GRID))
+    p.add_argument("--profiles", nargs="+", default=["lean"])
+    p.add_argument("-k", type=int, default=5, help="Chunks retrieved per query")
+    p.add_argument("--probes", type=int, default=200, help="Max title queries (0 = all)")
+    p.add_argument("--tolerance", type=float, default=0.02,
+                   help="Recall a setting may give up for fewer context tokens")
+    p.add_argument("--embeddings", choices=BACKENDS, default=None,
+                   help="Embedding backend (default: $EMBED_BACKEND or auto)")
+    p.add_argument("--build", action="store_true", help="Rebuild the index with the recommendation")
+    args = p.parse_args()
+
+    db_dir = args.db or f"chroma_db_{os.path.basename(args.file)}"
+    results, best = autotune(args.file, args.max_tokens, args.profiles, k=args.k,
+                             probes=args.probes or None, embedding_backend=args.embeddings,
+                             tolerance=args.tolerance)
+    print(format_results(results, best, args.k))
+    write_recommendation(db_dir, best, results, k=args.k, embedding_backend=args.embeddings)
+    print(f"Recommended max_tokens={best.max_tokens} profile={best.profile} -> {db_dir}/manifest.json")
+    if args.build:
+        from second_brain_chat.mindmap_chat import build_index
+        from second_brain_chat.shards import build_sharded_index, is_sharded
+        if is_sharded(db_dir):
+            # rebuild every shard the same way, just with the new chunking
+            manifest = read_manifest(db_dir)
+            build_sharded_index(list(manifest["sources"].values()), db_dir, **manifest["sharding"],
+                                embedding_backend=args.embeddings or manifest.get("embedding", {}).get("backend"))
+        else:
+            build_index(args.file, db_dir, embedding_backend=args.embeddings)
+        print("Index rebuilt.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Batch query mode: run a JSONL file of questions through retrieval (and optionally
+generation) in one go, for evaluations and regression runs.
+
+    python -m second_brain_chat.batch queries.jsonl --mm map.mm --out results.jsonl --generate
+
+Each input line is {"id": ..., "query": "..."} ("question" is accepted too).
+Each output line carries the retrieved chunks, the answer if requested and
+per-query timings in milliseconds.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from langchain.prompts import ChatPromptTemplate
+
+def read_queries(path: str) -> List[Dict]:
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            text = record.get("query", record.get("question"))
+            if not isinstance(text, str):
+                raise ValueError(f"{path}:{n}: expected a 'query' string")
+            queries.append({"id": record.get("id", n), "query": text})
+    return queries
+
+def write_results(path: str, results: Iterable[Dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+def _search_batch(store, texts: List[str], top_k: int, search_batch_size: int) -> List[Dict]:
+    # embed every query in one call
+    t0 = time.perf_counter()
+    vectors = store.embeddings.embed_documents(texts)
+    embed_ms = (time.perf_counter() - t0) * 1000 / max(len(texts), 1)
+
+    out: List[Dict] = []
+    if not hasattr(store, "_collection"):
+        # sharded index: no single collection, so each query is its own scatter-gather
+        for vector in vectors:
+            t0 = time.perf_counter()
+            hits = store.similarity_search_by_vector_with_score(vector, k=top_k)
+            out.append({
+                "results": [{"content": d.page_content, "metadata": d.metadata, "distance": dist}
+                            for d, dist in hits],
+                "timings_ms": {"embed": round(embed_ms, 3),
+                               "search": round((time.perf_counter() - t0) * 1000, 3)},
+            })
+        return out
+    for start in range(0, len(texts), search_batch_size):
+        group = vectors[start:start + search_batch_size]
+        # one vectorized nearest-neighbour query for the whole group
+        t0 = time.perf_counter()
+        hits = store._collection.query(
+            query_embeddings=group,
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"],
+        )
+        search_ms = (time.perf_counter() - t0) * 1000 / len(group)
+        for docs, metas, dists in zip(hits["documents"], hits["metadatas"], hits["distances"]):
+            out.append({
+                "results": [
+                    {"content": d, "metadata": m or {}, "distance": dist}
+                    for d, m, dist in zip(docs, metas, dists)
+                ],
+                "timings_ms": {"embed": round(embed_ms, 3), "search": round(search_ms, 3)},
+            })
+    return out
+
+def run_batch(queries: List[Dict], store, top_k: int = 5, llm_chain=None,
+              workers: int = 4, search_batch_size: int = 256) -> List[Dict]:
+    """
+    Retrieves context for all queries with one embedding call and batched vector
+    searches, then (if llm_chain is given) generates answers on a bounded worker pool.
+    Results come back in input order.
+    """
+    texts = [q["query"] for q in queries]
+    searched = _search_batch(store, texts, top_k, search_batch_size) if texts else []
+    results = [dict(q, **s) for q, s in zip(queries, searched)]
+
+    if llm_chain is not None:
+        def generate(r: Dict) -> Dict:
+            context = "\n".join(hit["content"] for hit in r["results"])
+            t0 = time.perf_counter()
+            try:
+                r["answer"] = llm_chain.invoke({"input": r["query"], "context": context}).content
+            except Exception as e:
+                r["error"] = str(e)
+            r["timings_ms"]["generate"] = round((time.perf_counter() - t0) * 1000, 3)
+            return r
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(generate, results))
+
+    for r in results:
+        r["timings_ms"]["total"] = round(sum(r["timings_ms"].values()), 3)
+    return results
+
+def _answer_chain():
+    from second_brain_chat.llm_client import get_llm, bounded
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a helpful assistant that answers from the user's notes."),
+        ("human", "{input}\n\nRelevant notes:\n{context}")
+    ])
+    return bounded(prompt | get_llm(streaming=False))
+
+def main(argv: Optional[List[str]] = None):
+    from second_brain_chat.mindmap_chat import build_index, has_index, load_index
+    from second_brain_chat.shards import ShardedIndex, is_sharded
+
+    p = argparse.ArgumentParser(description="Run a JSONL file of queries through the index")
+    p.add_argument("queries", help="JSONL file with one {\"id\", \"query\"} object per line")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--mm", help="Mindmap to query (index is built if missing)")
+    src.add_argument("--db", help="Existing Chroma index directory")
+    p.add_argument("--out", default="results.jsonl", help="Where to write JSONL results")
+    p.add_argument("-k", "--top-k", type=int, default=5)
+    p.add_argument("--generate", action="store_true", help="Also generate an answer per query")
+    p.add_argument("--workers", type=int, default=4, help="Concurrent generations")
+    args = p.parse_args(argv)
+
+    db_dir = args.db or f"chroma_db_{os.path.basename(args.mm)}"
+    if is_sharded(db_dir):
+        store = ShardedIndex(db_dir)
+    elif args.mm and not has_index(db_dir):
+        store = build_index(args.mm, db_dir)
+    else:
+        store = load_index(db_dir)
+
+    queries = read_queries(args.queries)
+    started = time.perf_counter()
+    results = run_batch(queries, store, top_k=args.top_k,
+                        llm_chain=_answer_chain() if args.generate else None,
+                        workers=args.workers)
+    write_results(args.out, results)
+    elapsed = time.perf_counter() - started
+    print(f"{len(results)} queries in {elapsed:.2f}s "
+          f"({len(results) / elapsed if elapsed else 0:.1f} q/s) -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,14 @@
 import os
-import requests
+from typing import Iterator
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import HumanMessage
-from langchain_openai import ChatOpenAI
+from second_brain_chat.llm_client import get_llm, bounded, check_health
 
 load_dotenv()
 
-# Validate LM Studio availability
-try:
-    requests.get(os.getenv("OPENAI_API_BASE"), timeout=2)
-except Exception:
-    print("⚠️ LM Studio server not reachable at", os.getenv("OPENAI_API_BASE"))
-    exit(1)
-
-# Set up the LLM
-llm = ChatOpenAI(
-    base_url=os.getenv("OPENAI_API_BASE"),
-    api_key=os.getenv("OPENAI_API_KEY", "not-needed-for-local"),
-    model_name=os.getenv("LLM_MODEL", "Gemma-3-12b-it"),
-    temperature=float(os.getenv("LLM_TEMP", "0.7")),
-    max_tokens=int(os.getenv("LLM_MAX_TOKENS", "512")),
-)
+# Set up the LLM (shared, pooled client)
+llm = get_llm()
 
 # Create prompt
 prompt = ChatPromptTemplate.from_messages([
@@ -29,16 +16,33 @@ prompt = ChatPromptTemplate.from_messages([
     ("human", "{input}")
 ])
 
-# Use prompt + model as a LangChain Runnable
-chain = prompt | llm
-
-# Chat loop
-while True:
-    query = input("\nYou> ")
-    if query.strip().lower() in {"exit", "quit"}:
-        break
-    try:
-        result = chain.invoke({"input": query})
-        print("\nAssistant>\n", result.content)
-    except Exception as e:
-        print("❌ Error calling LLM:", e)
+# Use prompt + model as a LangChain Runnable, capped by the shared in-flight limit
+chain = bounded(prompt | llm)
+
+def stream_reply(query: str, llm_chain=chain) -> Iterator[str]:
+    # Yield the reply token by token instead of waiting for the whole message
+    for chunk in llm_chain.stream({"input": query}):
+        if chunk.content:
+            yield chunk.content
+
+def main():
+    # Validate LM Studio availability
+    if not check_health():
+        print("⚠️ LM Studio server not reachable at", os.getenv("OPENAI_API_BASE"))
+        exit(1)
+
+    # Chat loop
+    while True:
+        query = input("\nYou> ")
+        if query.strip().lower() in {"exit", "quit"}:
+            break
+        try:
+            print("\nAssistant>")
+            for piece in stream_reply(query):
+                print(piece, end="", flush=True)
+            print()
+        except Exception as e:
+            print("❌ Error calling LLM:", e)
+
+if __name__ == "__main__":
+    main()
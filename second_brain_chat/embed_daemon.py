@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Local embedding daemon: loads the embedding model once, warms it up and serves
+embed requests over a Unix domain socket (protocol in embeddings.py).
+
+    python -m second_brain_chat.embed_daemon &          # then run any CLI as usual
+    python -m second_brain_chat.embed_daemon --socket /run/user/1000/sbc.sock
+
+Requests from concurrent clients are coalesced into one model call when they
+arrive within a few milliseconds of each other.
+"""
+import argparse
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from second_brain_chat.embeddings import (
+    EMBED_MODEL, STATUS_MODEL_MISMATCH, EmbeddingDaemonError, default_socket_path,
+    encode_error, encode_response, local_embeddings, read_request,
+)
+
+logger = logging.getLogger(__name__)
+
+class Batcher:
+    """Single model thread; merges queued requests up to max_batch texts per call."""
+
+    def __init__(self, embedder: Embeddings, max_batch: int = 256, max_wait: float = 0.002):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: List[str]) -> "Future[np.ndarray]":
+        fut: Future = Future()
+        self._queue.put((texts, fut))
+        return fut
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            texts = [t for texts, _ in batch for t in texts]
+            try:
+                vectors = np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            start = 0
+            for texts, fut in batch:
+                fut.set_result(vectors[start:start + len(texts)])
+                start += len(texts)
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # a connection carries any number of requests until the client hangs up
+        while True:
+            try:
+                model_name, texts = read_request(self.request)
+            except (ConnectionError, OSError):
+                return
+            except (EmbeddingDaemonError, UnicodeDecodeError) as e:
+                self.request.sendall(encode_error(str(e)))
+                return
+            if model_name != self.server.model_name:
+                self.request.sendall(encode_error(
+                    f"Embedding daemon on {self.server.server_address} serves {self.server.model_name}, "
+                    f"not {model_name}", STATUS_MODEL_MISMATCH))
+                continue
+            try:
+                reply = encode_response(self.server.batcher.submit(texts).result())
+            except Exception as e:
+                reply = encode_error(f"{type(e).__name__}: {e}")
+            try:
+                self.request.sendall(reply)
+            except OSError:
+                return
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embedder: Embeddings, model_name: str = EMBED_MODEL, **batch_opts):
+        _claim_socket_path(socket_path)
+        self.model_name = model_name
+        self.batcher = Batcher(embedder, **batch_opts)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+def _claim_socket_path(socket_path: str) -> None:
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)  # stale socket left by a daemon that died
+        return
+    finally:
+        probe.close()
+    raise EmbeddingDaemonError(f"An embedding daemon is already listening on {socket_path}")
+
+def serve(socket_path: Optional[str] = None, model_name: str = EMBED_MODEL,
+          embedder: Optional[Embeddings] = None) -> None:
+    socket_path = socket_path or default_socket_path()
+    started = time.perf_counter()
+    embedder = embedder or local_embeddings(model_name)
+    embedder.embed_documents(["warm-up"])  # first call pays for lazy init and kernel selection
+    server = EmbeddingServer(socket_path, embedder, model_name)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Embedding daemon ready on {socket_path} ({model_name}, {time.perf_counter() - started:.1f}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    p = argparse.ArgumentParser(description="Serve embeddings over a Unix domain socket")
+    p.add_argument("--socket", default=None, help="Socket path (default: $EMBED_SOCKET or a per-user runtime path)")
+    p.add_argument("--model", default=EMBED_MODEL, help="sentence-transformers model name")
+    args = p.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve(args.socket, args.model)
+
+if __name__ == "__main__":
+    main()
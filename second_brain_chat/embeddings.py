@@ -0,0 +1,221 @@
+"""
+Embedding backends shared by every index and chat entry point.
+
+get_embeddings() returns a LangChain Embeddings. By default ("auto") that is a client
+for the local embedding daemon (see embed_daemon.py), which keeps the model loaded
+between CLI runs; if no daemon is listening it falls back to loading the model
+in-process, exactly as before.
+
+Wire protocol (Unix domain socket, persistent connection, big-endian headers):
+    request:  b"SBE2" | u32 model length | model name | u32 count | count x (u32 length | utf-8 bytes)
+    response: b"SBE2" | u8 status | u32 count | u32 dim | count*dim little-endian float32
+              (status 1 = error, 2 = the daemon serves another model: count is the byte
+              length of a utf-8 message instead)
+
+Every request names the model the client expects, so vectors from a daemon started
+with a different --model never end up in an index built with this one.
+"""
+import functools
+import os
+import socket
+import struct
+import logging
+import threading
+import tempfile
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+MAGIC = b"SBE2"
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_MODEL_MISMATCH = 2
+_REQ_HEADER = struct.Struct("!4sI")
+_RESP_HEADER = struct.Struct("!4sBII")
+_LEN = struct.Struct("!I")
+
+class EmbeddingDaemonError(Exception):
+    pass
+
+class EmbeddingModelMismatch(EmbeddingDaemonError):
+    pass
+
+def default_socket_path() -> str:
+    if os.getenv("EMBED_SOCKET"):
+        return os.environ["EMBED_SOCKET"]
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"second_brain_chat_embed-{os.getuid()}.sock")
+
+def local_embeddings(model_name: str = EMBED_MODEL) -> Embeddings:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+# --- framing ---
+
+def recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise ConnectionError("Embedding socket closed mid-message")
+        buf.extend(part)
+    return bytes(buf)
+
+def encode_request(texts: List[str], model_name: str = EMBED_MODEL) -> bytes:
+    model = model_name.encode("utf-8")
+    parts = [_REQ_HEADER.pack(MAGIC, len(model)), model, _LEN.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_LEN.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def read_request(sock: socket.socket) -> Tuple[str, List[str]]:
+    """Returns (model name, texts)."""
+    magic, length = _REQ_HEADER.unpack(recv_exact(sock, _REQ_HEADER.size))
+    if magic != MAGIC:
+        raise EmbeddingDaemonError("Bad request magic")
+    model_name = recv_exact(sock, length).decode("utf-8")
+    (count,) = _LEN.unpack(recv_exact(sock, _LEN.size))
+    texts = []
+    for _ in range(count):
+        (length,) = _LEN.unpack(recv_exact(sock, _LEN.size))
+        texts.append(recv_exact(sock, length).decode("utf-8"))
+    return model_name, texts
+
+def encode_response(vectors: np.ndarray) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    count, dim = vectors.shape if vectors.size else (len(vectors), 0)
+    return _RESP_HEADER.pack(MAGIC, STATUS_OK, count, dim) + vectors.tobytes()
+
+def encode_error(message: str, status: int = STATUS_ERROR) -> bytes:
+    data = message.encode("utf-8")
+    return _RESP_HEADER.pack(MAGIC, status, len(data), 0) + data
+
+def read_response(sock: socket.socket) -> np.ndarray:
+    magic, status, count, dim = _RESP_HEADER.unpack(recv_exact(sock, _RESP_HEADER.size))
+    if magic != MAGIC:
+        raise EmbeddingDaemonError("Bad response magic")
+    if status != STATUS_OK:
+        message = recv_exact(sock, count).decode("utf-8", "replace")
+        raise (EmbeddingModelMismatch if status == STATUS_MODEL_MISMATCH else EmbeddingDaemonError)(message)
+    return np.frombuffer(recv_exact(sock, count * dim * 4), dtype="<f4").reshape(count, dim)
+
+# --- client ---
+
+class DaemonEmbeddings(Embeddings):
+    """
+    Embeddings served by the embedding daemon over a persistent Unix socket connection.
+    If the daemon is not running, or serves a model other than `model_name`, falls back
+    to `fallback()` (`model_name` in-process by default) unless fallback=False, in which
+    case EmbeddingDaemonError is raised.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None,
+                 fallback: Union[Callable[[], Embeddings], bool, None] = None,
+                 model_name: str = EMBED_MODEL):
+        self.socket_path = socket_path or default_socket_path()
+        self.model_name = model_name
+        self._fallback_factory = (functools.partial(local_embeddings, model_name)
+                                  if fallback in (None, True) else fallback)
+        self._fallback: Optional[Embeddings] = None
+        self._mismatch: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[socket.socket]:
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                return None
+            self._sock = sock
+        return self._sock
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _via_daemon(self, texts: List[str]) -> Optional[np.ndarray]:
+        with self._lock:
+            if self._mismatch:
+                return None
+            # one reconnect attempt covers a daemon that restarted since the last call
+            for _ in range(2):
+                sock = self._connect()
+                if sock is None:
+                    return None
+                try:
+                    sock.sendall(encode_request(texts, self.model_name))
+                    return read_response(sock)
+                except EmbeddingModelMismatch as e:
+                    # the daemon won't change model while this client lives; stop asking it
+                    self._close()
+                    self._mismatch = str(e)
+                    logger.warning("%s", e)
+                    return None
+                except (OSError, ConnectionError):
+                    self._close()
+            return None
+
+    def _local(self) -> Embeddings:
+        if not self._fallback_factory:
+            if self._mismatch:
+                raise EmbeddingModelMismatch(self._mismatch)
+            raise EmbeddingDaemonError(f"No embedding daemon listening on {self.socket_path}")
+        if self._fallback is None:
+            logger.info("No usable embedding daemon on %s, loading %s in-process",
+                        self.socket_path, self.model_name)
+            self._fallback = self._fallback_factory()
+        return self._fallback
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self._via_daemon(list(texts))
+        if vectors is None:
+            return self._local().embed_documents(texts)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def __getstate__(self):
+        # sockets and loaded models don't cross process boundaries
+        state = self.__dict__.copy()
+        state.update(_sock=None, _fallback=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+BACKENDS = ("auto", "local", "daemon", "hashing")
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    return backend or os.getenv("EMBED_BACKEND", "auto")
+
+def get_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """
+    backend: "auto" (daemon if running, else in-process), "local" (always in-process),
+    "daemon" (daemon required) or "hashing" (model-free n-gram hashing, see
+    hashing_embeddings.py). Defaults to $EMBED_BACKEND, then "auto".
+    """
+    backend = resolve_backend(backend)
+    if backend == "hashing":
+        from second_brain_chat.hashing_embeddings import HashingEmbeddings
+        return HashingEmbeddings()
+    if backend == "auto":
+        return DaemonEmbeddings()
+    if backend == "local":
+        return local_embeddings()
+    if backend == "daemon":
+        return DaemonEmbeddings(fallback=False)
+    raise ValueError(f"Unknown embedding backend '{backend}' (choose from {', '.join(BACKENDS)})")
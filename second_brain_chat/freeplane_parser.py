@@ -1,5 +1,8 @@
+import os
 import xml.etree.ElementTree as ET
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Dict, FrozenSet, Optional, Tuple, Union
 from dataclasses import dataclass
 import tiktoken
 import logging
@@ -21,22 +24,63 @@ class Node:
 class MMParseError(Exception):
     pass
 
+# Freeplane bookkeeping and layout attributes: useful to Freeplane, noise to an LLM
+LAYOUT_ATTRIBUTES = frozenset({
+    'CREATED', 'MODIFIED', 'POSITION', 'FOLDED', 'STYLE', 'COLOR', 'BACKGROUND_COLOR',
+    'STYLE_REF', 'LOCALIZED_STYLE_REF', 'FORMAT', 'HGAP', 'HGAP_QUANTITY', 'VGAP',
+    'VGAP_QUANTITY', 'VSHIFT', 'VSHIFT_QUANTITY', 'MAX_WIDTH', 'MIN_WIDTH', 'CHILD_NODES_LAYOUT',
+    'NUMBERED', 'TEXT_SHORTENED', 'FORMAT_AS_HYPERLINK', 'UID',
+})
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """
+    Controls what node_to_markdown emits besides headings.
+    allow (if set) whitelists metadata keys, deny blacklists them; dedupe_notes keeps
+    notes out of the metadata comment and drops notes that merely repeat the node text.
+    """
+    name: str
+    include_metadata: bool = True
+    allow: Optional[FrozenSet[str]] = None
+    deny: FrozenSet[str] = frozenset()
+    include_notes: bool = True
+    dedupe_notes: bool = False
+
+RENDER_PROFILES: Dict[str, RenderProfile] = {
+    'full': RenderProfile('full'),
+    'lean': RenderProfile('lean', deny=LAYOUT_ATTRIBUTES, dedupe_notes=True),
+    'text-only': RenderProfile('text-only', include_metadata=False, dedupe_notes=True),
+}
+
+def get_profile(profile: Union[str, RenderProfile, None] = None) -> RenderProfile:
+    if profile is None:
+        return RENDER_PROFILES['full']
+    if isinstance(profile, RenderProfile):
+        return profile
+    try:
+        return RENDER_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown render profile '{profile}' (choose from {', '.join(RENDER_PROFILES)})")
+
 def normalize_richcontent(rc_elem: ET.Element) -> str:
     """
     Extracts and flattens richcontent (notes) into a simple string.
     Links become [Link: URL], images become [Image: path], text is preserved.
     """
-    parts: List[str] = []
-    # hyperlinks
-    for a in rc_elem.findall('.//a'):
-        href = a.get('href')
-        if href:
-            parts.append(f"[Link: {href}]")
-    # images
-    for img in rc_elem.findall('.//img'):
-        src = img.get('src')
-        if src:
-            parts.append(f"[Image: {src}]")
+    links: List[str] = []
+    images: List[str] = []
+    # hyperlinks and images in one pass (iter() walks the tree in C)
+    for e in rc_elem.iter():
+        tag = e.tag
+        if tag == 'a':
+            href = e.get('href')
+            if href:
+                links.append(f"[Link: {href}]")
+        elif tag == 'img':
+            src = e.get('src')
+            if src:
+                images.append(f"[Image: {src}]")
+    parts = links + images
     # plaintext inside richcontent
     for txt in rc_elem.itertext():
         t = txt.strip()
@@ -45,24 +89,29 @@ def normalize_richcontent(rc_elem: ET.Element) -> str:
     return ' '.join(parts)
 
 
-def parse_node(elem: ET.Element) -> Node:
+def _node_fields(elem: ET.Element):
     node_id = elem.get('ID', '')
     text = elem.get('TEXT', '')
     # capture standard attributes
     metadata = {k: v for k, v in elem.items() if k not in ('ID', 'TEXT')}
-    # capture richcontent notes
+    return node_id, text, metadata
+
+def parse_node(elem: ET.Element) -> Node:
+    node_id, text, metadata = _node_fields(elem)
+    # single pass over the children: richcontent notes and child nodes
     notes = []
-    for rc in elem.findall('richcontent'):
-        if rc.get('TYPE', '').upper() == 'NOTE':
-            notes.append(normalize_richcontent(rc))
+    children = []
+    for child in elem:
+        if child.tag == 'node':
+            children.append(parse_node(child))
+        elif child.tag == 'richcontent' and child.get('TYPE', '').upper() == 'NOTE':
+            notes.append(normalize_richcontent(child))
     if notes:
         metadata['notes'] = ' '.join(notes)
-    # recurse into child nodes
-    children = [parse_node(child) for child in elem.findall('node')]
     return Node(id=node_id, text=text, children=children, metadata=metadata)
 
 
-def parse_mm(filepath: str) -> Node:
+def _root_element(filepath: str) -> ET.Element:
     try:
         tree = ET.parse(filepath)
     except ET.ParseError as e:
@@ -71,30 +120,49 @@ def parse_mm(filepath: str) -> Node:
     root_elem = tree.getroot().find('node')
     if root_elem is None:
         raise ValueError("No <node> element found in MM file")
-    return parse_node(root_elem)
-
+    return root_elem
 
-def node_to_markdown(node: Node, depth: int = 1) -> str:
+def parse_mm(filepath: str) -> Node:
+    return parse_node(_root_element(filepath))
+
+
+def _render_metadata(metadata: Dict[str, str], profile: RenderProfile) -> Dict[str, str]:
+    if not profile.include_metadata:
+        return {}
+    return {
+        k: v for k, v in metadata.items()
+        if (profile.allow is None or k in profile.allow)
+        and k not in profile.deny
+        and not (profile.dedupe_notes and k == 'notes')
+    }
+
+def node_to_markdown(node: Node, depth: int = 1,
+                     profile: Union[str, RenderProfile, None] = None) -> str:
+    profile = get_profile(profile)
     lines: List[str] = []
     # Heading reflects depth
     prefix = '#' * depth
     heading = f"{prefix} {node.text}" if node.text else prefix
     lines.append(heading)
     # metadata comment block
-    if node.metadata:
-        meta = '; '.join(f"{k}={v}" for k, v in node.metadata.items())
+    metadata = _render_metadata(node.metadata, profile)
+    if metadata:
+        meta = '; '.join(f"{k}={v}" for k, v in metadata.items())
         lines.append(f"<!-- {meta} -->")
     # inline note rendering
-    note = node.metadata.get('notes', '')
+    note = node.metadata.get('notes', '') if profile.include_notes else ''
+    if profile.dedupe_notes and note.strip() == node.text.strip():
+        note = ''
     if note:
         lines.append(f"> Note: {note}")
     # child subtrees
     for child in node.children:
-        lines.append(node_to_markdown(child, depth + 1))
+        lines.append(node_to_markdown(child, depth + 1, profile))
     return '\n'.join(lines)
 
-def chunk_node(node: Node, max_tokens: int = 1000) -> List[str]:
-    md = node_to_markdown(node)
+def chunk_node(node: Node, max_tokens: int = 1000,
+               profile: Union[str, RenderProfile, None] = None) -> List[str]:
+    md = node_to_markdown(node, profile=profile)
     if count_tokens(md) <= max_tokens:
         return [md]
 
@@ -115,22 +183,66 @@ def chunk_node(node: Node, max_tokens: int = 1000) -> List[str]:
 
     # Internal node: recurse into children
     for child in node.children:
-        chunks.extend(chunk_node(child, max_tokens))
+        chunks.extend(chunk_node(child, max_tokens, profile))
 
     return chunks
 
 
+def _parse_branch(xml: bytes, max_tokens: int, profile: RenderProfile):
+    # runs in a worker: parse, render and chunk one top-level branch
+    node = parse_node(ET.fromstring(xml))
+    return node, node_to_markdown(node, 2, profile), chunk_node(node, max_tokens, profile)
+
+def parse_and_chunk(filepath: str, max_tokens: int = 1000,
+                    profile: Union[str, RenderProfile, None] = None,
+                    workers: Optional[int] = 1) -> Tuple[Node, List[str]]:
+    """
+    parse_mm + chunk_node, optionally spread over a process pool by top-level branch.
+    Returns the same tree and chunks (in document order) as the serial calls.
+    workers=None uses every CPU.
+    """
+    profile = get_profile(profile)
+    workers = workers or os.cpu_count() or 1
+    root_elem = _root_element(filepath)
+    branches = root_elem.findall('node')
+    if workers <= 1 or len(branches) < 2:
+        root = parse_node(root_elem)
+        return root, chunk_node(root, max_tokens, profile)
+
+    payloads = []
+    for branch in branches:
+        # serialize without the tail: it belongs to the parent, not the branch
+        tail, branch.tail = branch.tail, None
+        payloads.append(ET.tostring(branch))
+        branch.tail = tail
+    with ProcessPoolExecutor(max_workers=min(workers, len(payloads))) as pool:
+        results = list(pool.map(_parse_branch, payloads, repeat(max_tokens), repeat(profile),
+                                chunksize=max(1, len(payloads) // (workers * 4))))
+
+    # rebuild the root exactly as parse_node / chunk_node would
+    node_id, text, metadata = _node_fields(root_elem)
+    notes = [normalize_richcontent(rc) for rc in root_elem.findall('richcontent')
+             if rc.get('TYPE', '').upper() == 'NOTE']
+    if notes:
+        metadata['notes'] = ' '.join(notes)
+    root = Node(id=node_id, text=text, children=[r[0] for r in results], metadata=metadata)
+    header = node_to_markdown(Node(id=node_id, text=text, children=[], metadata=metadata), 1, profile)
+    root_md = '\n'.join([header] + [r[1] for r in results])
+    if count_tokens(root_md) <= max_tokens:
+        return root, [root_md]
+    return root, [chunk for r in results for chunk in r[2]]
 
 
 if __name__ == '__main__':
     import sys
     if len(sys.argv) < 2:
-        print("Usage: python freeplane_parser.py path/to/mindmap.mm [max_tokens]")
+        print("Usage: python freeplane_parser.py path/to/mindmap.mm [max_tokens] [full|lean|text-only]")
         sys.exit(1)
     filepath = sys.argv[1]
     max_toks = int(sys.argv[2]) if len(sys.argv) >= 3 else 1000
+    profile_name = sys.argv[3] if len(sys.argv) >= 4 else 'full'
     root = parse_mm(filepath)
-    chunks = chunk_node(root, max_toks)
+    chunks = chunk_node(root, max_toks, profile_name)
     for i, c in enumerate(chunks, 1):
         print(f"--- Chunk {i} ({count_tokens(c)} tokens) ---")
         print(c)
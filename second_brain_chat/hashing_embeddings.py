@@ -0,0 +1,129 @@
+"""
+Model-free embeddings: signed feature hashing of character and word n-grams.
+
+No model to download or load, so the first vector is ready in milliseconds; meant for
+CI, edge boxes and quick lookups where torch + MiniLM is too heavy. Quality is lexical
+(shared spellings and words), not semantic; see benchmarks/embedding_recall.py.
+
+Hashes are computed with NumPy over whole arrays of n-grams (no per-feature Python
+calls) and are stable across processes and machines, so an index built in one run can
+be queried from another. Optional TF-IDF weights are fitted on the indexed chunks and
+saved next to the index (fit/save/load).
+"""
+import os
+import re
+import json
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from langchain_core.embeddings import Embeddings
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# 64-bit polynomial rolling hash + murmur3 finaliser; uint64 arithmetic wraps
+_BASE = np.uint64(0x100000001B3)
+_MIX1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX2 = np.uint64(0xC4CEB9FE1A85EC53)
+_SALT = np.uint64(0x9E3779B97F4A7C15)
+_WORD_KIND = 0x100  # keeps word n-gram features apart from char n-grams of the same n
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    h = h ^ (h >> np.uint64(33))
+    h = h * _MIX1
+    h = h ^ (h >> np.uint64(33))
+    h = h * _MIX2
+    return h ^ (h >> np.uint64(33))
+
+def _ngram_hashes(codes: np.ndarray, n: int, kind: int) -> np.ndarray:
+    """Hashes of every length-n window of `codes` (uint64), as one vector op per position."""
+    if len(codes) < n:
+        return np.empty(0, dtype=np.uint64)
+    windows = len(codes) - n + 1
+    h = np.full(windows, ((kind + n) * int(_SALT)) & 0xFFFFFFFFFFFFFFFF, dtype=np.uint64)
+    for j in range(n):
+        h = h * _BASE + codes[j:j + windows]
+    return _mix(h)
+
+class HashingEmbeddings(Embeddings):
+    def __init__(self, n_features: int = 1024, char_ngrams: Tuple[int, int] = (3, 5),
+                 word_ngrams: Tuple[int, int] = (1, 2), lowercase: bool = True,
+                 idf: Optional[Sequence[float]] = None):
+        self.n_features = n_features
+        self.char_ngrams = tuple(char_ngrams)
+        self.word_ngrams = tuple(word_ngrams)
+        self.lowercase = lowercase
+        self.idf = None if idf is None else np.asarray(idf, dtype=np.float32)
+        if self.idf is not None and self.idf.shape != (n_features,):
+            raise ValueError(f"idf has {self.idf.shape[0]} weights, expected {n_features}")
+
+    # --- features ---
+
+    def _hashes(self, text: str) -> np.ndarray:
+        if self.lowercase:
+            text = text.lower()
+        parts = []
+        # pad with spaces so word starts/ends become features of their own
+        chars = np.frombuffer(f" {text} ".encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        for n in range(self.char_ngrams[0], self.char_ngrams[1] + 1):
+            parts.append(_ngram_hashes(chars, n, 0))
+        words = _WORD.findall(text)
+        if words:
+            word_ids = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words),
+                                   dtype=np.uint64, count=len(words))
+            for n in range(self.word_ngrams[0], self.word_ngrams[1] + 1):
+                parts.append(_ngram_hashes(word_ids, n, _WORD_KIND))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        """Raw signed term counts, one row per text (duplicates summed by scipy)."""
+        hashes = [self._hashes(t) for t in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(h) for h in hashes])
+        h = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+        cols = (h % np.uint64(self.n_features)).astype(np.int64)
+        # top bit picks the sign, so collisions cancel out on average instead of piling up
+        signs = np.where(h >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+        counts = sparse.csr_matrix((signs, (rows, cols)), shape=(len(texts), self.n_features))
+        counts.eliminate_zeros()
+        return counts
+
+    def _vectors(self, texts: List[str]) -> np.ndarray:
+        counts = self.transform(texts)
+        if self.idf is not None:
+            counts = counts @ sparse.diags(self.idf)
+        dense = counts.toarray().astype(np.float32)
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        return dense / np.where(norms == 0, 1, norms)
+
+    # --- TF-IDF ---
+
+    def fit(self, texts: List[str]) -> "HashingEmbeddings":
+        """Learns IDF weights from a corpus (usually the chunks being indexed)."""
+        df = np.bincount(self.transform(texts).indices, minlength=self.n_features)
+        # smoothed like scikit-learn: unseen features weigh the most, never zero
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def save(self, path: str) -> None:
+        state = {"n_features": self.n_features, "char_ngrams": self.char_ngrams,
+                 "word_ngrams": self.word_ngrams, "lowercase": self.lowercase,
+                 "idf": None if self.idf is None else self.idf.tolist()}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "HashingEmbeddings":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    # --- langchain Embeddings ---
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._vectors(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vectors([text])[0].tolist()
@@ -1,11 +1,18 @@
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from second_brain_chat.embeddings import get_embeddings
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
 from langchain.schema import Document
 
-def index_chunks(chunks, metadata=None):
-    embedding_model = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
+def index_chunks(chunks, metadata=None, profile=None, embedding_backend=None):
+    embedding_model = get_embeddings(embedding_backend)
+    if isinstance(embedding_model, HashingEmbeddings):
+        embedding_model.fit(chunks)
+    metadata = dict(metadata or {})
+    if profile is not None:
+        # record how the chunks were rendered so mixed indexes can be told apart
+        metadata['render_profile'] = getattr(profile, 'name', profile)
     vectorstore = Chroma.from_documents(
-        documents=[Document(page_content=chunk, metadata=metadata or {}) for chunk in chunks],
+        documents=[Document(page_content=chunk, metadata=metadata) for chunk in chunks],
         embedding=embedding_model,
     )
     return vectorstore
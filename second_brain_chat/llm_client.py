@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import httpx
+import openai
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# How many generations the (single) local LM Studio server is asked to run at once,
+# how many callers may queue behind them, and how long a caller waits for a slot.
+MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "2"))
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "120"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "300"))
+HEALTH_TTL = float(os.getenv("LLM_HEALTH_TTL", "300"))
+HEALTH_CACHE = os.getenv(
+    "LLM_HEALTH_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "second_brain_chat", "llm_health.json"),
+)
+
+# Errors worth retrying: the server was unreachable, timed out, overloaded or hiccuped.
+TRANSIENT_ERRORS: Tuple[type, ...] = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+)
+
+class LLMBusyError(Exception):
+    pass
+
+class _AsyncWaiter:
+    """Queue entry for a coroutine: granted a slot by whoever frees one, via its loop."""
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+def _settle(future: asyncio.Future, granted: bool) -> None:
+    if not future.done():
+        future.set_result(granted)
+
+class ConcurrencyLimiter:
+    """
+    FIFO semaphore: at most max_in_flight holders, at most max_queue waiters.
+    Callers beyond the queue, or waiting longer than the timeout, get LLMBusyError
+    instead of piling more requests onto the server.
+
+    Threads (acquire) and coroutines (aacquire) share one queue. Coroutines wait on a
+    future instead of a thread, and a slot granted to a coroutine that was cancelled
+    meanwhile is handed straight back.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queue: int = MAX_QUEUE,
+                 timeout: float = QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            if not self._waiters and self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise LLMBusyError(f"LLM request queue is full ({self.max_queue} waiting)")
+            ticket = object()
+            self._waiters.append(ticket)
+            deadline = time.monotonic() + timeout
+            try:
+                while self._waiters[0] is not ticket or self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LLMBusyError(f"No free LLM slot after {timeout:.1f}s")
+                    self._cond.wait(remaining)
+                self._waiters.popleft()
+                self.in_flight += 1
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                raise
+            finally:
+                # the head of the queue may have changed either way
+                self._grant_async()
+                self._cond.notify_all()
+
+    async def aacquire(self, timeout: Optional[float] = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            if not self._waiters and self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise LLMBusyError(f"LLM request queue is full ({self.max_queue} waiting)")
+            waiter = _AsyncWaiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+        # not asyncio.wait_for: on 3.10/3.11 it can swallow a cancellation that races the grant
+        timer = waiter.loop.call_later(timeout, _settle, waiter.future, False)
+        try:
+            granted = await waiter.future
+        except BaseException:
+            with self._cond:
+                if waiter.granted:
+                    self.in_flight -= 1  # the slot arrived after the cancellation; hand it back
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._grant_async()
+                self._cond.notify_all()
+            raise
+        finally:
+            timer.cancel()
+        if granted:
+            return
+        with self._cond:
+            if waiter.granted:
+                return  # granted just as the timer fired
+            self._waiters.remove(waiter)
+            self._grant_async()
+            self._cond.notify_all()
+        raise LLMBusyError(f"No free LLM slot after {timeout:.1f}s")
+
+    def _grant_async(self) -> None:
+        # caller holds the lock: coroutines at the head of the queue get free slots here,
+        # threads take theirs themselves when notified
+        while (self._waiters and isinstance(self._waiters[0], _AsyncWaiter)
+               and self.in_flight < self.max_in_flight):
+            waiter = self._waiters.popleft()
+            try:
+                waiter.loop.call_soon_threadsafe(_settle, waiter.future, True)
+            except RuntimeError:
+                continue  # its event loop is closed; nobody is waiting any more
+            waiter.granted = True
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._grant_async()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, timeout: Optional[float] = None):
+        await self.aacquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    # "full jitter": spreads retries out so clients don't hammer the server in lockstep
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class BoundedRunnable:
+    """
+    Wraps a LangChain runnable (e.g. prompt | llm) so every call goes through the
+    shared ConcurrencyLimiter and transient failures are retried with jittered backoff.
+    Streams are only retried if they fail before the first chunk was yielded.
+    """
+
+    def __init__(self, runnable, limiter: Optional[ConcurrencyLimiter] = None,
+                 retries: int = MAX_RETRIES):
+        self.runnable = runnable
+        self.limiter = limiter or shared_limiter()
+        self.retries = retries
+
+    def _failed(self, attempt: int, err: Exception) -> None:
+        if attempt >= self.retries:
+            raise err
+        invalidate_health()
+        delay = backoff_delay(attempt)
+        logger.warning("Transient LLM error (%s), retry %d/%d in %.2fs", err, attempt + 1, self.retries, delay)
+        time.sleep(delay)
+
+    async def _afailed(self, attempt: int, err: Exception) -> None:
+        if attempt >= self.retries:
+            raise err
+        invalidate_health()
+        delay = backoff_delay(attempt)
+        logger.warning("Transient LLM error (%s), retry %d/%d in %.2fs", err, attempt + 1, self.retries, delay)
+        await asyncio.sleep(delay)
+
+    def invoke(self, inputs: Dict[str, Any], **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.limiter.slot():
+                    return self.runnable.invoke(inputs, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                self._failed(attempt, e)
+
+    def stream(self, inputs: Dict[str, Any], **kwargs) -> Iterator:
+        for attempt in range(self.retries + 1):
+            started = False
+            try:
+                with self.limiter.slot():
+                    for chunk in self.runnable.stream(inputs, **kwargs):
+                        started = True
+                        yield chunk
+                return
+            except TRANSIENT_ERRORS as e:
+                if started:
+                    raise
+                self._failed(attempt, e)
+
+    async def ainvoke(self, inputs: Dict[str, Any], **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.limiter.aslot():
+                    return await self.runnable.ainvoke(inputs, **kwargs)
+            except TRANSIENT_ERRORS as e:
+                await self._afailed(attempt, e)
+
+    async def astream(self, inputs: Dict[str, Any], **kwargs) -> AsyncIterator:
+        for attempt in range(self.retries + 1):
+            started = False
+            try:
+                async with self.limiter.aslot():
+                    async for chunk in self.runnable.astream(inputs, **kwargs):
+                        started = True
+                        yield chunk
+                return
+            except TRANSIENT_ERRORS as e:
+                if started:
+                    raise
+                await self._afailed(attempt, e)
+
+# --- shared, process-wide state ---
+
+_lock = threading.Lock()
+_limiter: Optional[ConcurrencyLimiter] = None
+_http_client: Optional[httpx.Client] = None
+_async_http_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_llms: Dict[Tuple, ChatOpenAI] = {}
+_health: Dict[str, float] = {}
+
+def shared_limiter() -> ConcurrencyLimiter:
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            _limiter = ConcurrencyLimiter()
+        return _limiter
+
+def _pool_limits() -> httpx.Limits:
+    # one keep-alive connection per in-flight slot; more would only queue inside the server
+    return httpx.Limits(max_connections=MAX_IN_FLIGHT, max_keepalive_connections=MAX_IN_FLIGHT,
+                        keepalive_expiry=60)
+
+def http_client() -> httpx.Client:
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_pool_limits(),
+                                        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=5))
+        return _http_client
+
+def async_http_client() -> httpx.AsyncClient:
+    """
+    The async pool for the running event loop. Its connections belong to that loop and
+    fail when reused from another one (asyncio.run() per request, say), so each loop
+    gets its own; pools of loops that have since closed are dropped.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        for closed in [l for l in _async_http_clients if l.is_closed()]:
+            del _async_http_clients[closed]
+        if loop not in _async_http_clients:
+            _async_http_clients[loop] = httpx.AsyncClient(limits=_pool_limits(),
+                                                          timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=5))
+        return _async_http_clients[loop]
+
+class _LoopLocalCompletions:
+    """ChatOpenAI.async_client that sends each call through the running loop's pool."""
+
+    def __init__(self, base_url: Optional[str], api_key: str):
+        self.base_url = base_url
+        self.api_key = api_key
+
+    def _completions(self):
+        return openai.AsyncOpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0,
+                                  http_client=async_http_client()).chat.completions
+
+    def create(self, *args, **kwargs):
+        # called (not awaited yet) inside the coroutine, so the loop is already running
+        return self._completions().create(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)  # keeps copy/pickle probes from recursing
+        return getattr(self._completions(), name)
+
+def get_llm(base_url: Optional[str] = None, streaming: bool = True, **overrides) -> ChatOpenAI:
+    """
+    Returns a ChatOpenAI bound to the shared connection pool, built once per configuration.
+    Retries are left to BoundedRunnable (max_retries=0 here) so they respect the limiter.
+    """
+    base_url = base_url or os.getenv("OPENAI_API_BASE")
+    key = (base_url, streaming, tuple(sorted(overrides.items())))
+    with _lock:
+        if key in _llms:
+            return _llms[key]
+    api_key = os.getenv("OPENAI_API_KEY", "not-needed-for-local")
+    params = dict(
+        model_name=os.getenv("LLM_MODEL", "Gemma-3-12b-it"),
+        temperature=float(os.getenv("LLM_TEMP", "0.7")),
+        max_tokens=int(os.getenv("LLM_MAX_TOKENS", "512")),
+    )
+    params.update(overrides)
+    llm = ChatOpenAI(
+        base_url=base_url,
+        api_key=api_key,
+        streaming=streaming,
+        max_retries=0,
+        client=openai.OpenAI(base_url=base_url, api_key=api_key, max_retries=0,
+                             http_client=http_client()).chat.completions,
+        async_client=_LoopLocalCompletions(base_url, api_key),
+        **params,
+    )
+    with _lock:
+        return _llms.setdefault(key, llm)
+
+def bounded(runnable) -> BoundedRunnable:
+    return BoundedRunnable(runnable)
+
+# --- cached health state ---
+
+def _read_health_cache() -> Dict[str, float]:
+    try:
+        with open(HEALTH_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_health_cache(cache: Dict[str, float]) -> None:
+    try:
+        os.makedirs(os.path.dirname(HEALTH_CACHE), exist_ok=True)
+        with open(HEALTH_CACHE, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        logger.debug("Could not write health cache %s: %s", HEALTH_CACHE, e)
+
+def _probe(base_url: str) -> bool:
+    try:
+        http_client().get(base_url, timeout=2)
+        return True
+    except Exception:
+        return False
+
+def check_health(base_url: Optional[str] = None, ttl: float = HEALTH_TTL, force: bool = False) -> bool:
+    """
+    True if the server answered a probe within the last `ttl` seconds (this process or
+    a previous one), otherwise probes it now. Only successes are cached, so a server that
+    comes back up is noticed on the next call.
+    """
+    base_url = base_url or os.getenv("OPENAI_API_BASE")
+    if not base_url:
+        return False
+    now = time.time()
+    if not force:
+        checked_at = _health.get(base_url) or _read_health_cache().get(base_url)
+        if checked_at and now - checked_at < ttl:
+            _health[base_url] = checked_at
+            return True
+    if not _probe(base_url):
+        invalidate_health(base_url)
+        return False
+    _health[base_url] = now
+    cache = _read_health_cache()
+    cache[base_url] = now
+    _write_health_cache(cache)
+    return True
+
+def invalidate_health(base_url: Optional[str] = None) -> None:
+    base_url = base_url or os.getenv("OPENAI_API_BASE")
+    if base_url is None or (base_url not in _health and base_url not in _read_health_cache()):
+        return
+    _health.pop(base_url, None)
+    cache = _read_health_cache()
+    if cache.pop(base_url, None) is not None:
+        _write_health_cache(cache)
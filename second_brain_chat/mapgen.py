@@ -0,0 +1,78 @@
+"""
+Synthetic Freeplane maps for benchmarks and tests.
+
+The maps mimic real exports: every node carries ID/CREATED/MODIFIED stamps, some carry
+POSITION/FOLDED/COLOR/STYLE attributes, and a share of nodes has an HTML note with
+links and images.
+"""
+import random
+from typing import List
+from xml.sax.saxutils import quoteattr
+
+WORDS = (
+    "project idea research habit health finance reading writing garden travel family "
+    "career learning python music design meeting review plan goal budget recipe sleep "
+    "exercise journal book article podcast course workshop client invoice backlog sprint "
+    "architecture database index query latency memory cache network security privacy"
+).split()
+
+def _phrase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def _note(rng: random.Random, words: int) -> str:
+    body = " ".join(f"<p>{_phrase(rng, 12)}</p>" for _ in range(max(1, words // 12)))
+    link = f'<a href="https://example.com/{rng.choice(WORDS)}/{rng.randint(1, 999)}">{rng.choice(WORDS)}</a>'
+    img = f'<img src="images/{rng.choice(WORDS)}.png"/>' if rng.random() < 0.3 else ""
+    return (f'<richcontent TYPE="NOTE"><html><head/><body>{body} {link} {img}'
+            f'</body></html></richcontent>')
+
+def generate_map(branches: int = 10, depth: int = 3, fanout: int = 4,
+                 note_ratio: float = 0.3, note_words: int = 60, seed: int = 0) -> str:
+    """
+    Returns Freeplane XML with `branches` top-level branches, each a tree of the given
+    depth and fanout. Node titles are unique ("<words> <id>") so they can serve as
+    ground truth for retrieval probes.
+    """
+    rng = random.Random(seed)
+    counter = [0]
+
+    def node(level: int, position: str = "") -> str:
+        counter[0] += 1
+        nid = counter[0]
+        stamp = 1700000000000 + nid * 1000
+        attrs = {
+            "TEXT": f"{_phrase(rng, 3).title()} {nid}",
+            "ID": f"ID_{nid:08d}",
+            "CREATED": str(stamp),
+            "MODIFIED": str(stamp + rng.randint(0, 10 ** 9)),
+        }
+        if position:
+            attrs["POSITION"] = position
+        if rng.random() < 0.2:
+            attrs["COLOR"] = f"#{rng.randint(0, 0xFFFFFF):06x}"
+        if rng.random() < 0.1:
+            attrs["STYLE"] = rng.choice(["bubble", "fork"])
+        if level < depth and rng.random() < 0.2:
+            attrs["FOLDED"] = "true"
+        parts: List[str] = []
+        if rng.random() < note_ratio:
+            parts.append(_note(rng, note_words))
+        if level < depth:
+            parts.extend(node(level + 1) for _ in range(fanout))
+        attr_xml = " ".join(f"{k}={quoteattr(v)}" for k, v in attrs.items())
+        return f"<node {attr_xml}>{''.join(parts)}</node>"
+
+    root_children = "".join(
+        node(1, "right" if i % 2 == 0 else "left") for i in range(branches)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<map version="freeplane 1.9.13">'
+        f'<node TEXT="Second Brain" ID="ID_root" CREATED="1700000000000" MODIFIED="1700000000000">'
+        f"{root_children}</node></map>"
+    )
+
+def write_map(path: str, **kwargs) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(generate_map(**kwargs))
+    return path
@@ -1,12 +1,14 @@
 import os
-import requests
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional
 from dotenv import load_dotenv
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from sentence_transformers import SentenceTransformer
+from second_brain_chat.embeddings import get_embeddings
+from second_brain_chat.memory_store import DurableMemoryStore
 from langchain.prompts import ChatPromptTemplate
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
-from langchain_openai import ChatOpenAI
+from second_brain_chat.llm_client import get_llm, bounded, check_health
 from langchain_core.runnables import Runnable
 import tiktoken
 
@@ -15,53 +17,123 @@ def count_tokens(text, encoding_name="cl100k_base"):
     enc = tiktoken.get_encoding(encoding_name)
     return len(enc.encode(text))
 
-# Set up local embedding model and LangChain-compatible wrapper
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-embedding_fn = lambda texts: embedding_model.encode(texts, normalize_embeddings=True)
+def reported_output_tokens(chunk) -> Optional[int]:
+    """Completion token count the server attached to a streamed chunk, if any."""
+    usage = getattr(chunk, "usage_metadata", None)
+    if isinstance(usage, dict) and usage.get("output_tokens"):
+        return usage["output_tokens"]
+    metadata = getattr(chunk, "response_metadata", None)
+    usage = metadata.get("token_usage") if isinstance(metadata, dict) else None
+    if isinstance(usage, dict) and usage.get("completion_tokens"):
+        return usage["completion_tokens"]
+    return None
 
-embedding = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-vectorstore = Chroma(embedding_function=embedding, persist_directory=None)
+@dataclass
+class StreamStats:
+    """
+    Running totals for a streamed response, updated as each chunk arrives.
 
-# Memory stub — stores last N interactions
-chat_memory = []
+    Without a usage report from the server, `tokens` is the sum of cl100k_base counts of
+    the individual pieces: an approximation, since a token can straddle two pieces and
+    the model's own tokenizer may differ. Once a chunk carries usage (usually the last
+    one, when the server supports it), that count replaces the estimate and
+    `from_server` is set.
+    """
+    tokens: int = 0
+    first_token_s: Optional[float] = None
+    total_s: Optional[float] = None
+    from_server: bool = False
+
+    def record(self, chunk, started: float, enc) -> None:
+        piece = chunk.content
+        if piece and self.first_token_s is None:
+            self.first_token_s = time.perf_counter() - started
+        reported = reported_output_tokens(chunk)
+        if reported is not None:
+            self.tokens, self.from_server = reported, True
+        elif piece and not self.from_server:
+            self.tokens += len(enc.encode(piece))
+
+# Embeddings from the shared daemon if running, else a local all-MiniLM-L6-v2 model
+embedding = get_embeddings()
+
+# Conversation memory persists here (write-ahead log + Chroma collection)
+MEMORY_DIR = os.getenv("MEMORY_DIR", "memory_db")
+
+def open_memory(persist_directory: str = MEMORY_DIR) -> DurableMemoryStore:
+    return DurableMemoryStore(
+        persist_directory,
+        embedding,
+        batch_size=int(os.getenv("MEMORY_BATCH_SIZE", "32")),
+        flush_interval=float(os.getenv("MEMORY_FLUSH_INTERVAL", "1.0")),
+        fsync=os.getenv("MEMORY_FSYNC", "true").lower() != "false",
+    )
+
+# Memory stub — stores last N interactions (older ones live on in the vector store)
+chat_memory = deque(maxlen=int(os.getenv("CHAT_MEMORY_TURNS", "50")))
 
 # Set up environment variables
 load_dotenv()
 
-# Skip LM Studio validation in CI (GitHub Actions, etc.)
-if os.getenv("CI") == "true":
-    print("⚠️ Skipping LM Studio server validation in CI environment.")
-else:
-    try:
-        requests.get(os.getenv("OPENAI_API_BASE"), timeout=2)
-    except Exception:
-        print("⚠️ LM Studio server not reachable at", os.getenv("OPENAI_API_BASE"))
-        exit(1)
-
 
-# Set up the LLM
-llm = ChatOpenAI(
-    base_url=os.getenv("OPENAI_API_BASE"),
-    api_key=os.getenv("OPENAI_API_KEY", "not-needed-for-local"),
-    model_name=os.getenv("LLM_MODEL", "Gemma-3-12b-it"),
-    temperature=float(os.getenv("LLM_TEMP", "0.7")),
-    max_tokens=int(os.getenv("LLM_MAX_TOKENS", "512")),
-    streaming=True,
-    callbacks=[StreamingStdOutCallbackHandler()],
-)
+# Set up the LLM (shared, pooled client)
+llm = get_llm(streaming=True)
 
-def run_chat_turn(user_input: str, vectorstore, llm_chain) -> str:
+def _remember_and_retrieve(user_input: str, vectorstore) -> str:
     # Add the user's input to the vector store
-    vectorstore.add_texts([user_input])    
+    vectorstore.add_texts([user_input])
     # Retrieve relevant context from the vectorstore
-    context = "\n".join([r.page_content for r in vectorstore.similarity_search(user_input, k=3)])
+    return "\n".join([r.page_content for r in vectorstore.similarity_search(user_input, k=3)])
+
+def run_chat_turn(user_input: str, vectorstore, llm_chain) -> str:
+    context = _remember_and_retrieve(user_input, vectorstore)
     # Use the passed-in llm_chain to generate a response
     response = llm_chain.invoke({"input": user_input, "context": context})
     # Return the content of the response (i.e., assistant's reply)
     return response.content
 
+def stream_chat_turn(user_input: str, vectorstore, llm_chain,
+                     stats: Optional[StreamStats] = None) -> Iterator[str]:
+    """
+    Same as run_chat_turn, but yields the reply piece by piece as the LLM produces it.
+    Pass a StreamStats to get token counts and time-to-first-token without re-encoding
+    the full response afterwards.
+    """
+    started = time.perf_counter()
+    enc = tiktoken.get_encoding("cl100k_base")
+    context = _remember_and_retrieve(user_input, vectorstore)
+    for chunk in llm_chain.stream({"input": user_input, "context": context}):
+        if stats is not None:
+            stats.record(chunk, started, enc)
+        if chunk.content:
+            yield chunk.content
+    if stats is not None:
+        stats.total_s = time.perf_counter() - started
+
+async def astream_chat_turn(user_input: str, vectorstore, llm_chain,
+                            stats: Optional[StreamStats] = None) -> AsyncIterator[str]:
+    """Async counterpart of stream_chat_turn, for servers running an event loop."""
+    started = time.perf_counter()
+    enc = tiktoken.get_encoding("cl100k_base")
+    # vector store calls are blocking; keep them off the event loop
+    context = await asyncio.to_thread(_remember_and_retrieve, user_input, vectorstore)
+    async for chunk in llm_chain.astream({"input": user_input, "context": context}):
+        if stats is not None:
+            stats.record(chunk, started, enc)
+        if chunk.content:
+            yield chunk.content
+    if stats is not None:
+        stats.total_s = time.perf_counter() - started
+
 # Main loop for interactive chatting
 def start_chat():
+    # Skip LM Studio validation in CI (GitHub Actions, etc.)
+    if os.getenv("CI") == "true":
+        print("⚠️ Skipping LM Studio server validation in CI environment.")
+    elif not check_health():
+        print("⚠️ LM Studio server not reachable at", os.getenv("OPENAI_API_BASE"))
+        exit(1)
+
     print("Start chatting with your local-memory assistant. Type 'exit' to quit.")
     
     # Construct the prompt and LLM chain outside of the function
@@ -70,25 +142,31 @@ def start_chat():
         ("human", "{input}\n\nRelevant memory:\n{context}")
     ])
     
-    llm_chain = prompt | llm  # Construct the llm_chain for this session
-    
-    while True:
-        user_input = input("\nUser: ")
-        if user_input.strip().lower() == "exit":
-            break
-        
-        # Call the chat function
-        assistant_response = run_chat_turn(user_input, vectorstore, llm_chain)
-        
-        # Count and display the number of tokens in the assistant's response
-        response_tokens = count_tokens(assistant_response)
-        print(f"[Response token count: {response_tokens}]")
-        
-        # Display assistant's response
-        print(f"\nAssistant:\n{assistant_response}")
-        
-        # Add interaction to chat memory log
-        chat_memory.append((user_input, assistant_response))
+    llm_chain = bounded(prompt | llm)  # Construct the llm_chain for this session
+    vectorstore = open_memory()  # replays anything a previous session didn't commit
+
+    try:
+        while True:
+            user_input = input("\nUser: ")
+            if user_input.strip().lower() == "exit":
+                break
+
+            # Stream the assistant's response as it is generated
+            stats = StreamStats()
+            print("\nAssistant:")
+            pieces = []
+            for piece in stream_chat_turn(user_input, vectorstore, llm_chain, stats):
+                print(piece, end="", flush=True)
+                pieces.append(piece)
+            assistant_response = "".join(pieces)
+
+            # Display the number of tokens counted while streaming
+            print(f"\n[Response token count: {stats.tokens}{'' if stats.from_server else ' (estimated)'}]")
+
+            # Add interaction to chat memory log
+            chat_memory.append((user_input, assistant_response))
+    finally:
+        vectorstore.close()
 
 if __name__ == "__main__":
     start_chat()
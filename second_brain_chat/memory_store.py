@@ -0,0 +1,209 @@
+"""
+Durable chat memory with write-behind vector indexing.
+
+add_texts() only appends the texts to a write-ahead log (one JSON line each, flushed
+and optionally fsynced) and returns. A background thread group-commits pending
+entries to the vector store, one embedding call per batch, then advances a
+checkpoint. On startup, log entries past the checkpoint are replayed, so memory
+survives exits and crashes.
+
+Searches see committed entries only; a text becomes searchable within
+flush_interval seconds (or when batch_size texts are pending).
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from langchain_community.vectorstores import Chroma
+
+logger = logging.getLogger(__name__)
+
+WAL_NAME = "memory.wal"
+CHECKPOINT_NAME = "memory.checkpoint"
+
+class DurableMemoryStore:
+    def __init__(self, persist_directory: str, embedding=None, batch_size: int = 32,
+                 flush_interval: float = 1.0, fsync: bool = True,
+                 collection_name: str = "chat_memory", vectorstore=None,
+                 compact_bytes: int = 1 << 20):
+        os.makedirs(persist_directory, exist_ok=True)
+        self.persist_directory = persist_directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.compact_bytes = compact_bytes
+        self.vectorstore = vectorstore or Chroma(
+            collection_name=collection_name,
+            embedding_function=embedding,
+            persist_directory=persist_directory,
+        )
+        self._wal_path = os.path.join(persist_directory, WAL_NAME)
+        self._checkpoint_path = os.path.join(persist_directory, CHECKPOINT_NAME)
+        self._cond = threading.Condition()
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._committed = self._read_checkpoint()
+        self._seq = self._committed
+        self._stopping = False
+        self._force = False
+        self._replay()
+        self._wal = open(self._wal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="memory-commit", daemon=True)
+        self._thread.start()
+
+    # --- startup ---
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self._checkpoint_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _replay(self) -> None:
+        if not os.path.exists(self._wal_path):
+            return
+        good_bytes = 0
+        with open(self._wal_path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # torn write from a crash mid-append
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    break
+                good_bytes += len(raw)
+                self._seq = max(self._seq, record["seq"])
+                if record["seq"] > self._committed:
+                    self._pending.append(record)
+        if good_bytes < os.path.getsize(self._wal_path):
+            logger.warning("Discarding torn tail of %s", self._wal_path)
+            with open(self._wal_path, "r+b") as f:
+                f.truncate(good_bytes)
+        if self._pending:
+            logger.info("Replaying %d uncommitted memory entries", len(self._pending))
+
+    # --- write path ---
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[dict]] = None, **kwargs) -> List[str]:
+        ids = []
+        with self._cond:
+            for i, text in enumerate(texts):
+                self._seq += 1
+                record = {"seq": self._seq, "ts": time.time(), "text": text,
+                          "metadata": (metadatas[i] if metadatas else None) or {}}
+                self._wal.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._pending.append(record)
+                ids.append(_doc_id(self._seq))
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return ids
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        # wait until a full batch is pending, the interval passes, or someone flushes
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while (len(self._pending) < self.batch_size and not self._force and not self._stopping):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if not self._pending:
+                self._force = False
+                return None
+            return [self._pending[i] for i in range(min(self.batch_size, len(self._pending)))]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                if self._stopping:
+                    return
+                continue
+            try:
+                self.vectorstore.add_texts(
+                    [r["text"] for r in batch],
+                    metadatas=[dict(r["metadata"], seq=r["seq"], ts=r["ts"]) for r in batch],
+                    ids=[_doc_id(r["seq"]) for r in batch],
+                )
+            except Exception:
+                logger.exception("Memory commit failed, will retry")
+                with self._cond:
+                    if self._stopping:
+                        return
+                    self._cond.wait(self.flush_interval)
+                continue
+            with self._cond:
+                for _ in batch:
+                    self._pending.popleft()
+                self._committed = batch[-1]["seq"]
+                if not self._pending:
+                    self._force = False
+                self._write_checkpoint()
+                self._maybe_compact()
+                self._cond.notify_all()
+
+    def _write_checkpoint(self) -> None:
+        tmp = self._checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(self._committed))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self._checkpoint_path)
+
+    def _maybe_compact(self) -> None:
+        # everything in the log is committed: start a fresh one (caller holds the lock)
+        if self._pending or self._wal.tell() < self.compact_bytes:
+            return
+        self._wal.close()
+        self._wal = open(self._wal_path, "w", encoding="utf-8")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until everything added so far is committed; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._seq
+            while self._committed < target:
+                if not self._thread.is_alive():
+                    return False
+                self._force = True
+                self._cond.notify_all()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._wal.close()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # --- read path ---
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return self.vectorstore.similarity_search(query, k=k, **kwargs)
+
+    def __getattr__(self, name):
+        # everything else (similarity_search_with_score, as_retriever, ...) goes to the store
+        if name == "vectorstore":
+            raise AttributeError(name)
+        return getattr(self.vectorstore, name)
+
+def _doc_id(seq: int) -> str:
+    # stable ids make replaying an already-committed entry an idempotent upsert
+    return f"memory-{seq}"
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Memory profile of the indexing and chat pipeline, stage by stage.
+
+Each stage is measured two ways:
+  - tracemalloc: peak and retained Python allocations (NumPy arrays included), i.e.
+    what the stage itself allocated, regardless of what the process held before;
+  - RSS: resident set size sampled every few milliseconds, which also sees native
+    memory tracemalloc can't (Chroma/hnswlib, sqlite, torch).
+
+"Retained" is what is still allocated after the stage returns and a gc pass; it is the
+number that grows without bound when something caches too much.
+
+    python -m second_brain_chat.memprofile                     # generated map, hashing embeddings
+    python -m second_brain_chat.memprofile map.mm --turns 200 --embeddings auto
+    python -m second_brain_chat.memprofile --branches 40 --json report.json
+
+The same measurements back the `memory_budget` pytest marker (see tests/conftest.py).
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+MB = 1024 * 1024
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the lifetime peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+class RSSSampler:
+    """Background thread that records the highest RSS seen while running."""
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_bytes())
+
+@dataclass
+class StageResult:
+    name: str
+    peak_bytes: int = 0          # tracemalloc high-water mark above the stage's start
+    retained_bytes: int = 0      # tracemalloc growth still allocated after the stage
+    rss_before: int = 0
+    rss_after: int = 0
+    rss_peak: int = 0
+    seconds: float = 0.0
+    extra: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def rss_growth(self) -> int:
+        return self.rss_peak - self.rss_before
+
+    def over_budget(self, peak_mb: Optional[float] = None, retained_mb: Optional[float] = None,
+                    rss_mb: Optional[float] = None) -> List[str]:
+        """Human-readable violations of the given budgets (MiB); empty if within budget."""
+        checks = [("peak", self.peak_bytes, peak_mb), ("retained", self.retained_bytes, retained_mb),
+                  ("RSS growth", self.rss_growth, rss_mb)]
+        return [f"{self.name}: {label} {used / MB:.1f} MiB > budget {limit:g} MiB"
+                for label, used, limit in checks if limit is not None and used > limit * MB]
+
+@contextmanager
+def measure(name: str, sample_interval: float = 0.005) -> Iterator[StageResult]:
+    """
+    Measures the block. Results are filled in on exit; keep the block's outputs
+    referenced until then, or they don't count as retained.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    result = StageResult(name)
+    gc.collect()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    result.rss_before = rss_bytes()
+    t0 = time.perf_counter()
+    try:
+        with RSSSampler(sample_interval) as sampler:
+            yield result
+    finally:
+        result.seconds = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+        result.peak_bytes = max(0, peak - base)
+        result.retained_bytes = max(0, current - base)
+        result.rss_after = rss_bytes()
+        result.rss_peak = sampler.peak
+        if started_tracing:
+            tracemalloc.stop()
+
+def stub_llm(reply: str = "noted."):
+    """A chat model stand-in: returns a fixed AIMessage, no server needed."""
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+    return RunnableLambda(lambda prompt: AIMessage(content=reply))
+
+def profile_pipeline(mm_path: str, turns: int = 50, max_tokens: int = 500, profile: str = "lean",
+                     embedding_backend: str = "hashing", db_dir: Optional[str] = None,
+                     memory_dir: Optional[str] = None) -> List[StageResult]:
+    """
+    Runs parse_mm, chunk_node, build_index, load_index and `turns` run_chat_turn calls,
+    measuring each. The LLM is always stubbed; embeddings default to the model-free
+    hashing backend so the numbers describe our code, not the embedding model.
+    """
+    from langchain.prompts import ChatPromptTemplate
+    from second_brain_chat.embeddings import get_embeddings
+    from second_brain_chat.freeplane_parser import chunk_node, parse_mm
+    from second_brain_chat.memory_chat import run_chat_turn
+    from second_brain_chat.memory_store import DurableMemoryStore
+    from second_brain_chat.mindmap_chat import build_index, load_index
+
+    db_dir = db_dir or tempfile.mkdtemp(prefix="memprofile-db-")
+    memory_dir = memory_dir or tempfile.mkdtemp(prefix="memprofile-memory-")
+    results = []
+    keep = []  # stage outputs stay alive so they count as retained
+
+    with measure("parse_mm") as stage:
+        root = parse_mm(mm_path)
+    results.append(stage)
+
+    with measure("chunk_node") as stage:
+        chunks = chunk_node(root, max_tokens=max_tokens, profile=profile)
+    stage.extra["chunks"] = len(chunks)
+    results.append(stage)
+
+    with measure("build_index") as stage:
+        keep.append(build_index(mm_path, db_dir, profile=profile, embedding_backend=embedding_backend))
+    results.append(stage)
+
+    with measure("load_index") as stage:
+        keep.append(load_index(db_dir))
+    results.append(stage)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", "You are a helpful assistant that uses memory snippets to respond."),
+        ("human", "{input}\n\nRelevant memory:\n{context}")
+    ])
+    memory = DurableMemoryStore(memory_dir, get_embeddings(embedding_backend), flush_interval=0.01, fsync=False)
+    try:
+        with measure(f"chat_turns x{turns}") as stage:
+            for i in range(turns):
+                run_chat_turn(f"turn {i}: what did I note about project {i % 7}?", memory, prompt | stub_llm())
+            memory.flush()
+        stage.extra["turns"] = turns
+        results.append(stage)
+    finally:
+        memory.close()
+    return results
+
+def format_report(results: List[StageResult]) -> str:
+    lines = [f"{'stage':<16} {'peak MiB':>9} {'retained':>9} {'RSS peak':>9} {'RSS +':>8} {'sec':>7}"]
+    for r in results:
+        lines.append(f"{r.name:<16} {r.peak_bytes / MB:>9.2f} {r.retained_bytes / MB:>9.2f} "
+                     f"{r.rss_peak / MB:>9.1f} {r.rss_growth / MB:>8.1f} {r.seconds:>7.2f}")
+    return "\n".join(lines)
+
+def main():
+    from second_brain_chat.mapgen import write_map
+
+    p = argparse.ArgumentParser(description="Per-stage memory profile of parse/index/chat")
+    p.add_argument("file", nargs="?", help="Path to .mm mindmap (default: a generated one)")
+    p.add_argument("--branches", type=int, default=20, help="Generated map: top-level branches")
+    p.add_argument("--depth", type=int, default=3, help="Generated map: depth per branch")
+    p.add_argument("--turns", type=int, default=50, help="Chat turns to run")
+    p.add_argument("--max-tokens", type=int, default=500)
+    p.add_argument("--profile", default="lean")
+    p.add_argument("--embeddings", default="hashing", help="Embedding backend (default: hashing)")
+    p.add_argument("--json", default=None, help="Also write the results to this file")
+    args = p.parse_args()
+
+    path = args.file or write_map(os.path.join(tempfile.mkdtemp(), "generated.mm"),
+                                  branches=args.branches, depth=args.depth)
+    results = profile_pipeline(path, turns=args.turns, max_tokens=args.max_tokens,
+                               profile=args.profile, embedding_backend=args.embeddings)
+    print(format_report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([dict(asdict(r), rss_growth=r.rss_growth) for r in results], f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,88 @@
 #!/usr/bin/env python3
-import argparse, os
+import argparse, json, os
+from typing import Optional
 from langchain.schema import Document
-from second_brain_chat.freeplane_parser import parse_mm, chunk_node
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from second_brain_chat.freeplane_parser import parse_and_chunk, get_profile, RENDER_PROFILES
+from second_brain_chat.embeddings import BACKENDS, get_embeddings, resolve_backend
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
 from langchain_community.vectorstores import Chroma
 
-def build_index(mm_path: str, db_dir: str = "chroma_db"):
-    root = parse_mm(mm_path)
-    chunks = chunk_node(root, max_tokens=500)
+MANIFEST_NAME = "manifest.json"
+HASHING_STATE = "hashing_embeddings.json"
+DEFAULT_MAX_TOKENS = 500
+
+def read_manifest(db_dir: str) -> dict:
+    # index directories describe themselves in manifest.json; missing means "defaults"
+    try:
+        with open(os.path.join(db_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def write_manifest(db_dir: str, manifest: dict) -> None:
     os.makedirs(db_dir, exist_ok=True)
+    path = os.path.join(db_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def tuned_chunking(manifest: dict) -> dict:
+    # autotune's recommendation wins for the next build; "chunking" is what the index was built with
+    return manifest.get("autotune", {}).get("recommended") or manifest.get("chunking", {})
+
+def has_index(db_dir: str) -> bool:
+    # a manifest alone (e.g. written by autotune) doesn't make an index
+    return os.path.exists(os.path.join(db_dir, "chroma.sqlite3"))
+
+def build_index(mm_path: str, db_dir: str = "chroma_db", profile=None, workers: int = 1,
+                summarize: bool = False, llm=None, embedding_backend=None,
+                max_tokens: Optional[int] = None):
+    # chunking not given here comes from the manifest (see autotune.py), then the defaults
+    previous = read_manifest(db_dir)
+    tuned = tuned_chunking(previous)
+    max_tokens = max_tokens or tuned.get("max_tokens", DEFAULT_MAX_TOKENS)
+    profile = get_profile(profile or tuned.get("profile", "full"))
+    root, chunks = parse_and_chunk(mm_path, max_tokens=max_tokens, profile=profile, workers=workers)
+    manifest = {
+        "chunking": {"max_tokens": max_tokens, "profile": profile.name},
+        "sources": {os.path.basename(mm_path): os.path.abspath(mm_path)},
+    }
+    if "autotune" in previous:
+        manifest["autotune"] = previous["autotune"]
+    if has_index(db_dir):
+        # rebuild from scratch: drop the old collection (through Chroma, whose client may be cached)
+        Chroma(persist_directory=db_dir).delete_collection()
 
-    # initialize the HuggingFaceEmbeddings wrapper
-    embedder = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    # embeddings come from the daemon if one is running, else an in-process model,
+    # unless a backend is chosen; hashing fits its IDF weights on these chunks
+    backend = resolve_backend(embedding_backend)
+    embedder = get_embeddings(backend)
+    manifest["embedding"] = {"backend": backend}
+    if isinstance(embedder, HashingEmbeddings):
+        embedder.fit(chunks)
+        os.makedirs(db_dir, exist_ok=True)
+        embedder.save(os.path.join(db_dir, HASHING_STATE))
+        manifest["embedding"]["state"] = HASHING_STATE
 
     # wrap each chunk in a langchain.schema.Document
     docs = [
-        Document(page_content=chunk, metadata={"source": os.path.basename(mm_path)})
+        Document(page_content=chunk, metadata={"source": os.path.basename(mm_path),
+                                               "render_profile": profile.name, "kind": "chunk"})
         for chunk in chunks
     ]
 
+    if summarize:
+        # branch summaries live next to the chunks; the cache skips unchanged branches
+        from second_brain_chat.summaries import load_cache, save_cache, summarize_tree, summary_documents
+        cache_path = os.path.join(db_dir, "summaries.json")
+        cache = load_cache(cache_path)
+        summaries = summarize_tree(root, llm=llm, cache=cache)
+        os.makedirs(db_dir, exist_ok=True)
+        save_cache(cache_path, {s.subtree_hash: s.summary for s in summaries})
+        docs.extend(summary_documents(summaries, os.path.basename(mm_path)))
+        manifest["summaries"] = len(summaries)
+    write_manifest(db_dir, manifest)
+
     # create & persist a Chroma vector store
     store = Chroma.from_documents(
         documents=docs,
@@ -27,11 +91,17 @@ def build_index(mm_path: str, db_dir: str = "chroma_db"):
     )
     return store
 
-def load_index(db_dir: str = "chroma_db"):
-    # same embedder used for querying
-    embedder = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+def index_embeddings(db_dir: str, embedding_backend=None):
+    # same embedder used for querying: whatever the manifest says the index was built with
+    recorded = read_manifest(db_dir).get("embedding", {})
+    backend = embedding_backend or recorded.get("backend")
+    if backend == "hashing" and recorded.get("state"):
+        return HashingEmbeddings.load(os.path.join(db_dir, recorded["state"]))
+    return get_embeddings(backend)
+
+def load_index(db_dir: str = "chroma_db", embedding_backend=None):
     return Chroma(
-        embedding=embedder,
+        embedding_function=index_embeddings(db_dir, embedding_backend),
         persist_directory=db_dir,
     )
 
@@ -39,20 +109,51 @@ def main():
     p = argparse.ArgumentParser()
     p.add_argument("file", help="Path to .mm mindmap")
     p.add_argument("--reindex", action="store_true", help="Rebuild index from scratch")
+    p.add_argument("--profile", choices=list(RENDER_PROFILES), default=None,
+                   help="How much node metadata goes into chunks (default: the tuned one "
+                        "from the index manifest, else lean)")
+    p.add_argument("--workers", type=int, default=1,
+                   help="Parse and chunk top-level branches in N processes (0 = all CPUs)")
+    p.add_argument("--embeddings", choices=BACKENDS, default=None,
+                   help="Embedding backend for a new index (default: $EMBED_BACKEND or auto; "
+                        "existing indexes use the one they were built with)")
+    p.add_argument("--summaries", action="store_true",
+                   help="Also index LLM summaries of every branch (for 'overview:' questions)")
+    p.add_argument("--shards", type=int, default=0,
+                   help="Split the index into N hash-partitioned shards built in parallel")
     args = p.parse_args()
 
+    if args.summaries and args.shards:
+        p.error("--summaries is not supported with --shards (summaries are only built for single-collection indexes)")
+
+    from second_brain_chat.shards import ShardedIndex, build_sharded_index, is_sharded
+
     db_dir = f"chroma_db_{os.path.basename(args.file)}"
-    if args.reindex or not os.path.isdir(db_dir):
-        store = build_index(args.file, db_dir)
+    profile = args.profile or tuned_chunking(read_manifest(db_dir)).get("profile", "lean")
+    if args.reindex or not (has_index(db_dir) or is_sharded(db_dir)):
+        if args.shards:
+            store = build_sharded_index([args.file], db_dir, n_shards=args.shards, by="hash",
+                                        profile=profile, embedding_backend=args.embeddings)
+        else:
+            store = build_index(args.file, db_dir, profile=profile, workers=args.workers or None,
+                                summarize=args.summaries, embedding_backend=args.embeddings)
+    elif is_sharded(db_dir):
+        store = ShardedIndex(db_dir)
     else:
         store = load_index(db_dir)
 
-    print("Index ready. Type your question (or 'quit'):")
+    print("Index ready. Type your question (or 'quit'; prefix 'overview:' for branch summaries):")
     while True:
         q = input(">> ").strip()
         if q.lower() in ("quit", "exit"):
             break
-        results = store.similarity_search(q, k=5)
+        if q.lower().startswith("overview:"):
+            from second_brain_chat.summaries import search_summaries
+            results = search_summaries(store, q[len("overview:"):], top_k=3)
+            if not results:
+                print("No branch summaries in this index; rebuild it with --reindex --summaries.")
+        else:
+            results = store.similarity_search(q, k=5)
         for doc in results:
             print(f"---\n{doc.page_content}\n")
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Sharded Chroma index for large corpora.
+
+Chunks are partitioned into N shards, either by source map ("source") or by a hash
+of the chunk text ("hash"). Each shard is its own persistent Chroma directory, built
+in a separate worker process. A manifest.json in the index directory records how the
+index was partitioned, so a single shard can be rebuilt without touching the others.
+Queries embed once, search all shards concurrently and merge the top-k by distance.
+
+    python -m second_brain_chat.shards build maps/*.mm --db chroma_shards --shards 8
+    python -m second_brain_chat.shards rebuild --db chroma_shards --shard 3
+    python -m second_brain_chat.shards query --db chroma_shards "what did I plan for the garden?"
+"""
+import argparse
+import functools
+import hashlib
+import heapq
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from langchain_community.vectorstores import Chroma
+
+from second_brain_chat.embeddings import get_embeddings, resolve_backend
+from second_brain_chat.freeplane_parser import parse_mm, chunk_node, get_profile
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mindmap_chat import (
+    DEFAULT_MAX_TOKENS, HASHING_STATE, index_embeddings, read_manifest, tuned_chunking, write_manifest,
+)
+
+PARTITIONS = ("source", "hash")
+
+def shard_of(source: str, chunk: str, n_shards: int, by: str = "source") -> int:
+    # crc32 rather than hash(): it must be stable across processes and runs
+    key = source if by == "source" else chunk
+    return zlib.crc32(key.encode("utf-8")) % n_shards
+
+def _shard_dir(shard_id: int) -> str:
+    return f"shard_{shard_id:03d}"
+
+def _chunk_id(source: str, position: int, chunk: str) -> str:
+    return hashlib.sha1(f"{source}\0{position}\0{chunk}".encode("utf-8")).hexdigest()
+
+def _partition(mm_paths: Sequence[str], n_shards: int, by: str, max_tokens: int,
+               profile, only: Optional[int] = None) -> Dict[int, List[Tuple[str, str, dict]]]:
+    """Parses and chunks the maps, returning {shard_id: [(id, text, metadata), ...]}."""
+    shards: Dict[int, List[Tuple[str, str, dict]]] = {i: [] for i in range(n_shards)}
+    for path in mm_paths:
+        source = os.path.basename(path)
+        if by == "source" and only is not None and shard_of(source, "", n_shards, by) != only:
+            continue
+        chunks = chunk_node(parse_mm(path), max_tokens=max_tokens, profile=profile)
+        for pos, chunk in enumerate(chunks):
+            shard_id = shard_of(source, chunk, n_shards, by)
+            if only is not None and shard_id != only:
+                continue
+            meta = {"source": source, "render_profile": profile.name, "kind": "chunk"}
+            shards[shard_id].append((_chunk_id(source, pos, chunk), chunk, meta))
+    return shards
+
+def _build_shard(shard_path: str, items: List[Tuple[str, str, dict]],
+                 embedding_factory: Callable) -> dict:
+    # runs in a worker process: each worker loads its own embedding model
+    started = time.perf_counter()
+    if os.path.isdir(shard_path):
+        # drop the old collection through Chroma rather than deleting files under it:
+        # an in-process client for this path may still be cached
+        Chroma(persist_directory=shard_path).delete_collection()
+    os.makedirs(shard_path, exist_ok=True)
+    if items:
+        ids, texts, metas = zip(*items)
+        Chroma.from_texts(texts=list(texts), metadatas=list(metas), ids=list(ids),
+                          embedding=embedding_factory(), persist_directory=shard_path)
+    digest = hashlib.sha1("".join(sorted(i[0] for i in items)).encode()).hexdigest()
+    return {
+        "chunks": len(items),
+        "sources": sorted({i[2]["source"] for i in items}),
+        "digest": digest,
+        "built_at": time.time(),
+        "build_s": round(time.perf_counter() - started, 3),
+    }
+
+def _run_builds(db_dir: str, shards: Dict[int, list], workers: int,
+                embedding_factory: Callable) -> Dict[int, dict]:
+    jobs = {sid: (os.path.join(db_dir, _shard_dir(sid)), items, embedding_factory)
+            for sid, items in shards.items()}
+    if workers <= 1 or len(jobs) <= 1:
+        return {sid: _build_shard(*args) for sid, args in jobs.items()}
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {sid: pool.submit(_build_shard, *args) for sid, args in jobs.items()}
+        return {sid: f.result() for sid, f in futures.items()}
+
+def build_sharded_index(mm_paths: Sequence[str], db_dir: str, n_shards: int = 4,
+                        by: str = "source", workers: Optional[int] = None,
+                        max_tokens: Optional[int] = None, profile=None,
+                        embedding_factory: Optional[Callable] = None,
+                        embedding_backend: Optional[str] = None) -> "ShardedIndex":
+    """
+    Embeddings come from `embedding_backend` (recorded in the manifest, so queries and
+    shard rebuilds use the same one) unless a custom `embedding_factory` is given; that
+    is not recorded, and the same embedder must be passed to ShardedIndex.
+    """
+    if by not in PARTITIONS:
+        raise ValueError(f"Unknown partitioning '{by}' (choose from {', '.join(PARTITIONS)})")
+    if n_shards < 1:
+        raise ValueError("n_shards must be at least 1")
+    names = [os.path.basename(p) for p in mm_paths]
+    if len(set(names)) != len(names):
+        raise ValueError("Maps must have distinct file names; they identify sources in the manifest")
+    # chunking not given here comes from the manifest (see autotune.py), as in build_index
+    previous = read_manifest(db_dir)
+    tuned = tuned_chunking(previous)
+    max_tokens = max_tokens or tuned.get("max_tokens", DEFAULT_MAX_TOKENS)
+    profile = get_profile(profile or tuned.get("profile", "full"))
+    workers = workers or os.cpu_count() or 1
+    shards = _partition(mm_paths, n_shards, by, max_tokens, profile)
+    embedding = None
+    if embedding_factory is None:
+        backend = resolve_backend(embedding_backend)
+        embedding = {"backend": backend}
+        embedding_factory = functools.partial(get_embeddings, backend)
+        if backend == "hashing":
+            # one IDF over the whole corpus, shared by every shard and by queries
+            os.makedirs(db_dir, exist_ok=True)
+            state = os.path.join(db_dir, HASHING_STATE)
+            HashingEmbeddings().fit([text for items in shards.values() for _, text, _ in items]).save(state)
+            embedding["state"] = HASHING_STATE
+            embedding_factory = functools.partial(HashingEmbeddings.load, state)
+    built = _run_builds(db_dir, shards, workers, embedding_factory)
+    manifest = {
+        "chunking": {"max_tokens": max_tokens, "profile": profile.name},
+        "sharding": {"n_shards": n_shards, "by": by},
+        "sources": {os.path.basename(p): os.path.abspath(p) for p in mm_paths},
+        "shards": {str(sid): dict(info, dir=_shard_dir(sid)) for sid, info in sorted(built.items())},
+    }
+    if embedding is not None:
+        manifest["embedding"] = embedding
+    if "autotune" in previous:
+        manifest["autotune"] = previous["autotune"]
+    write_manifest(db_dir, manifest)
+    return ShardedIndex(db_dir, embedding=embedding_factory())
+
+def rebuild_shard(db_dir: str, shard_id: int,
+                  embedding_factory: Optional[Callable] = None) -> dict:
+    """
+    Re-parses the shard's sources and rebuilds just that shard directory, with the
+    embeddings recorded in the manifest unless `embedding_factory` is given.
+    """
+    embedding_factory = embedding_factory or functools.partial(index_embeddings, db_dir)
+    manifest = read_manifest(db_dir)
+    if "shards" not in manifest:
+        raise ValueError(f"{db_dir} is not a sharded index (no shards in manifest)")
+    cfg, chunking = manifest["sharding"], manifest["chunking"]
+    if not 0 <= shard_id < cfg["n_shards"]:
+        raise ValueError(f"Shard {shard_id} out of range (index has {cfg['n_shards']})")
+    shards = _partition(list(manifest["sources"].values()), cfg["n_shards"], cfg["by"],
+                        chunking["max_tokens"], get_profile(chunking["profile"]), only=shard_id)
+    info = _build_shard(os.path.join(db_dir, _shard_dir(shard_id)), shards[shard_id], embedding_factory)
+    manifest["shards"][str(shard_id)] = dict(info, dir=_shard_dir(shard_id))
+    write_manifest(db_dir, manifest)
+    return info
+
+def is_sharded(db_dir: str) -> bool:
+    return "shards" in read_manifest(db_dir)
+
+class ShardedIndex:
+    """Read side of a sharded index, with the similarity_search API of a single store."""
+
+    def __init__(self, db_dir: str, embedding=None, workers: Optional[int] = None):
+        manifest = read_manifest(db_dir)
+        if "shards" not in manifest:
+            raise ValueError(f"{db_dir} is not a sharded index (no shards in manifest)")
+        self.embeddings = embedding or index_embeddings(db_dir)
+        self.stores = [
+            Chroma(embedding_function=self.embeddings,
+                   persist_directory=os.path.join(db_dir, info["dir"]))
+            for _, info in sorted(manifest["shards"].items(), key=lambda kv: int(kv[0]))
+            if info["chunks"]
+        ]
+        self._pool = ThreadPoolExecutor(max_workers=workers or max(1, len(self.stores)))
+
+    def similarity_search_by_vector_with_score(self, vector: List[float], k: int = 4,
+                                               filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        def search(store):
+            return store.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter)
+        hits = [hit for shard_hits in self._pool.map(search, self.stores) for hit in shard_hits]
+        # scores are distances: smaller is closer
+        return heapq.nsmallest(k, hits, key=lambda hit: hit[1])
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     filter: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(description="Build and query a sharded mindmap index")
+    sub = p.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Build all shards from scratch")
+    b.add_argument("files", nargs="+", help="Paths to .mm mindmaps")
+    b.add_argument("--db", required=True, help="Index directory")
+    b.add_argument("--shards", type=int, default=4)
+    b.add_argument("--by", choices=PARTITIONS, default="source")
+    b.add_argument("--workers", type=int, default=None, help="Build processes (default: CPU count)")
+    b.add_argument("--profile", default=None,
+                   help="Render profile (default: the tuned one from the manifest, else lean)")
+    r = sub.add_parser("rebuild", help="Rebuild a single shard")
+    r.add_argument("--db", required=True)
+    r.add_argument("--shard", type=int, required=True)
+    q = sub.add_parser("query", help="Search all shards")
+    q.add_argument("--db", required=True)
+    q.add_argument("-k", type=int, default=5)
+    q.add_argument("query")
+    args = p.parse_args(argv)
+
+    if args.command == "build":
+        profile = args.profile or tuned_chunking(read_manifest(args.db)).get("profile", "lean")
+        build_sharded_index(args.files, args.db, n_shards=args.shards, by=args.by,
+                            workers=args.workers, profile=profile)
+        for sid, info in sorted(read_manifest(args.db)["shards"].items(), key=lambda kv: int(kv[0])):
+            print(f"shard {sid}: {info['chunks']} chunks in {info['build_s']}s")
+    elif args.command == "rebuild":
+        info = rebuild_shard(args.db, args.shard)
+        print(f"shard {args.shard}: {info['chunks']} chunks in {info['build_s']}s")
+    else:
+        for doc, dist in ShardedIndex(args.db).similarity_search_with_score(args.query, k=args.k):
+            print(f"--- {doc.metadata.get('source')} (distance {dist:.3f})\n{doc.page_content}\n")
+
+if __name__ == "__main__":
+    main()
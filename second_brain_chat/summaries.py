@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Precomputed subtree summaries for broad questions.
+
+Every node with children gets an LLM-written summary of its branch, built bottom-up:
+a parent is summarised from its own text/notes plus its children's summaries (or text,
+for leaves). Nodes of the same height are summarised concurrently. Summaries are cached
+by a hash of the subtree's content, so after an edit only the changed branch and its
+ancestors are re-summarised.
+
+    python -m second_brain_chat.summaries map.mm --cache summaries.json
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import Document
+
+from second_brain_chat.freeplane_parser import Node, count_tokens
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You summarise one branch of the user's mind map. In 2-4 sentences, state the "
+               "main themes and notable specifics. No preamble."),
+    ("human", "Branch: {title}\n\n{content}")
+])
+
+MAX_INPUT_TOKENS = 3000
+
+@dataclass
+class SubtreeSummary:
+    node_id: str
+    title: str
+    depth: int
+    path: str
+    subtree_hash: str
+    summary: str
+
+def _content_hash(node: Node, child_hashes: List[str]) -> str:
+    # only what the summary is about: text, notes and the children (not CREATED/MODIFIED etc.)
+    h = hashlib.sha256()
+    h.update(node.text.encode("utf-8"))
+    h.update(b"\0")
+    h.update(node.metadata.get("notes", "").encode("utf-8"))
+    for child in child_hashes:
+        h.update(b"\0")
+        h.update(child.encode("ascii"))
+    return h.hexdigest()
+
+def _summary_input(node: Node, child_lines: List[str]) -> str:
+    lines = []
+    if node.metadata.get("notes"):
+        lines.append(f"Note: {node.metadata['notes']}")
+    lines.extend(child_lines)
+    content = "\n".join(lines)
+    # keep the prompt bounded on very wide branches: drop trailing children
+    while count_tokens(content) > MAX_INPUT_TOKENS and len(lines) > 1:
+        lines = lines[:max(1, len(lines) * 3 // 4)]
+        content = "\n".join(lines + ["- ..."])
+    return content
+
+def load_cache(path: Optional[str]) -> Dict[str, str]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_cache(path: str, cache: Dict[str, str]) -> None:
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)
+
+def summarize_tree(root: Node, llm=None, cache: Optional[Dict[str, str]] = None,
+                   workers: int = 4) -> List[SubtreeSummary]:
+    """
+    Summarises every node that has children, deepest branches first.
+    `cache` maps subtree hashes to summaries; it is read and updated in place.
+    Returns the summaries in document order.
+    """
+    if llm is None:
+        from second_brain_chat.llm_client import get_llm
+        llm = get_llm(streaming=False)
+    from second_brain_chat.llm_client import bounded
+    chain = bounded(SUMMARY_PROMPT | llm)
+    cache = {} if cache is None else cache
+
+    # post-order walk: hashes, heights and paths for every node
+    info: Dict[int, dict] = {}
+    order: List[Node] = []
+
+    def walk(node: Node, depth: int, path: str) -> None:
+        order.append(node)
+        for child in node.children:
+            walk(child, depth + 1, f"{path} > {child.text}" if path else child.text)
+        info[id(node)] = {
+            "depth": depth,
+            "path": path,
+            "height": 1 + max((info[id(c)]["height"] for c in node.children), default=-1),
+            "hash": _content_hash(node, [info[id(c)]["hash"] for c in node.children]),
+        }
+    walk(root, 1, root.text)
+
+    summaries: Dict[int, str] = {}
+
+    def summarize(node: Node) -> None:
+        key = info[id(node)]["hash"]
+        if key not in cache:
+            child_lines = [
+                f"- {child.text}: {summaries[id(child)]}" if child.children
+                else f"- {child.text}" + (f" ({child.metadata['notes']})" if child.metadata.get("notes") else "")
+                for child in node.children
+            ]
+            reply = chain.invoke({"title": node.text, "content": _summary_input(node, child_lines)})
+            cache[key] = reply.content.strip()
+        summaries[id(node)] = cache[key]
+
+    internal = [n for n in order if n.children]
+    heights = sorted({info[id(n)]["height"] for n in internal})
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for height in heights:
+            # every child of these nodes is lower, so already summarised
+            list(pool.map(summarize, [n for n in internal if info[id(n)]["height"] == height]))
+
+    return [
+        SubtreeSummary(node_id=n.id, title=n.text, depth=info[id(n)]["depth"], path=info[id(n)]["path"],
+                       subtree_hash=info[id(n)]["hash"], summary=summaries[id(n)])
+        for n in internal
+    ]
+
+def summary_documents(summaries: List[SubtreeSummary], source: str) -> List[Document]:
+    return [
+        Document(
+            page_content=f"# Summary: {s.title}\n{s.summary}",
+            metadata={"kind": "summary", "source": source, "node_id": s.node_id,
+                      "depth": s.depth, "path": s.path, "subtree_hash": s.subtree_hash},
+        )
+        for s in summaries
+    ]
+
+def search_summaries(store, query: str, top_k: int = 3) -> List[Document]:
+    """Broad questions: answer from a few branch summaries instead of many leaf chunks."""
+    if not query.strip():
+        return []
+    return store.similarity_search(query, k=top_k, filter={"kind": "summary"})
+
+def main():
+    from second_brain_chat.freeplane_parser import parse_mm
+
+    p = argparse.ArgumentParser(description="Summarise every branch of a mindmap")
+    p.add_argument("file", help="Path to .mm mindmap")
+    p.add_argument("--cache", default=None, help="Summary cache (default: <file>.summaries.json)")
+    p.add_argument("--workers", type=int, default=4, help="Concurrent LLM calls")
+    args = p.parse_args()
+
+    cache_path = args.cache or f"{args.file}.summaries.json"
+    cache = load_cache(cache_path)
+    cached = len(cache)
+    summaries = summarize_tree(parse_mm(args.file), cache=cache, workers=args.workers)
+    save_cache(cache_path, cache)
+    print(f"{len(summaries)} branches, {len(cache) - cached} newly summarised -> {cache_path}")
+    for s in summaries[:10]:
+        print(f"--- {s.path}\n{s.summary}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import pytest
+from second_brain_chat.memprofile import measure
+
+# @pytest.mark.memory_budget(peak_mb=..., retained_mb=..., rss_mb=...) measures the test
+# body (not its fixtures) and fails the test if any given budget is exceeded.
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("memory_budget")
+    if marker is None:
+        return (yield)
+    with measure(item.name) as stage:
+        result = yield
+    violations = stage.over_budget(**marker.kwargs)
+    if violations:
+        pytest.fail("memory budget exceeded: " + "; ".join(violations), pytrace=False)
+    return result
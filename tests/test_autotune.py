@@ -0,0 +1,113 @@
+import pytest
+from second_brain_chat.autotune import (
+    TrialResult, autotune, main, node_titles, recommend, relevant_chunks, write_recommendation,
+)
+from second_brain_chat.freeplane_parser import Node
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mapgen import write_map
+from second_brain_chat.mindmap_chat import build_index, read_manifest
+from second_brain_chat.shards import build_sharded_index, is_sharded, rebuild_shard
+
+def _trial(max_tokens, recall, context, vectors=10):
+    return TrialResult(max_tokens=max_tokens, profile="lean", vectors=vectors, build_s=0.1,
+                       search_ms=1.0, recall_at_k=recall, context_tokens=context, probes=50)
+
+@pytest.fixture
+def small_map(tmp_path):
+    return write_map(str(tmp_path / "small.mm"), branches=4, depth=2)
+
+def test_node_titles_skip_duplicates():
+    root = Node(id="r", text="Root", metadata={}, children=[
+        Node(id="a", text="Ideas", metadata={}, children=[]),
+        Node(id="b", text="Ideas", metadata={}, children=[]),
+        Node(id="c", text="Garden", metadata={}, children=[]),
+    ])
+    assert node_titles(root) == ["Root", "Garden"]
+
+def test_relevant_chunks_match_whole_headings():
+    chunks = ["# Plan 1\nbody", "## Plan 12", "text mentioning Plan 1"]
+    assert relevant_chunks("Plan 1", chunks) == {0}
+    assert relevant_chunks("Plan 12", chunks) == {1}
+
+def test_recommend_trades_tiny_recall_loss_for_smaller_context():
+    results = [_trial(200, 0.80, 900), _trial(500, 0.81, 1500), _trial(1000, 0.60, 400)]
+    assert recommend(results, tolerance=0.02).max_tokens == 200
+    assert recommend(results, tolerance=0.0).max_tokens == 500
+
+def test_autotune_measures_every_setting(small_map):
+    results, best = autotune(small_map, max_tokens_grid=(100, 400), profiles=("lean", "full"),
+                             k=3, probes=20, embedding_backend="hashing")
+    assert [(r.profile, r.max_tokens) for r in results] == [
+        ("lean", 100), ("lean", 400), ("full", 100), ("full", 400)]
+    assert all(r.probes == 20 and 0 <= r.recall_at_k <= 1 and r.vectors > 0 for r in results)
+    assert results[0].vectors >= results[1].vectors
+    assert best in results
+
+def test_build_index_uses_tuned_settings(small_map, tmp_path):
+    db_dir = str(tmp_path / "db")
+    results, _ = autotune(small_map, max_tokens_grid=(150, 600), k=3, probes=10, embedding_backend="hashing")
+    chosen = results[0]
+    write_recommendation(db_dir, chosen, results, k=3, embedding_backend="hashing")
+    assert "chunking" not in read_manifest(db_dir)
+
+    store = build_index(small_map, db_dir, embedding_backend="hashing")
+    manifest = read_manifest(db_dir)
+    assert manifest["chunking"] == {"max_tokens": 150, "profile": "lean"}
+    assert len(manifest["autotune"]["trials"]) == 2
+    assert store._collection.count() == chosen.vectors
+
+    # rebuilding replaces the collection instead of appending to it
+    store = build_index(small_map, db_dir, embedding_backend="hashing")
+    assert store._collection.count() == chosen.vectors
+
+    # explicit arguments still win over the manifest
+    build_index(small_map, db_dir, embedding_backend="hashing", max_tokens=600)
+    assert read_manifest(db_dir)["chunking"]["max_tokens"] == 600
+
+def test_recommendation_leaves_built_chunking_alone(small_map, tmp_path):
+    db_dir = str(tmp_path / "db")
+    build_sharded_index([small_map], db_dir, n_shards=2, by="hash", workers=1, max_tokens=500,
+                        profile="lean", embedding_backend="hashing")
+    before = read_manifest(db_dir)
+    write_recommendation(db_dir, _trial(100, 0.9, 300), [_trial(100, 0.9, 300)], k=3)
+    manifest = read_manifest(db_dir)
+    assert manifest["chunking"] == before["chunking"]
+    assert manifest["autotune"]["recommended"] == {"max_tokens": 100, "profile": "lean"}
+
+    # rebuilding one shard keeps the settings the other shards were built with
+    rebuild_shard(db_dir, 0)
+    assert read_manifest(db_dir)["shards"]["0"]["chunks"] == before["shards"]["0"]["chunks"]
+
+    # a fresh build takes the recommendation
+    build_sharded_index([small_map], db_dir, n_shards=2, by="hash", workers=1, embedding_backend="hashing")
+    assert read_manifest(db_dir)["chunking"] == {"max_tokens": 100, "profile": "lean"}
+
+def test_build_flag_rebuilds_sharded_index_as_shards(small_map, tmp_path, monkeypatch):
+    db_dir = str(tmp_path / "db")
+    build_sharded_index([small_map], db_dir, n_shards=2, by="hash", workers=1, max_tokens=500,
+                        profile="lean", embedding_backend="hashing")
+    monkeypatch.setattr("sys.argv", ["autotune", small_map, "--db", db_dir, "--max-tokens", "100",
+                                     "--probes", "5", "-k", "3", "--build"])
+    main()
+    manifest = read_manifest(db_dir)
+    assert is_sharded(db_dir)
+    assert manifest["sharding"] == {"n_shards": 2, "by": "hash"}
+    assert manifest["chunking"] == {"max_tokens": 100, "profile": "lean"}
+    assert manifest["embedding"]["backend"] == "hashing"
+    assert not (tmp_path / "db" / "chroma.sqlite3").exists()
+
+def test_cli_rejects_unknown_embedding_backend(small_map, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["autotune", small_map, "--embeddings", "hashnig"])
+    with pytest.raises(SystemExit):
+        main()
+
+def test_autotune_loads_embedder_once(small_map, monkeypatch):
+    created = []
+
+    def fake_get_embeddings(backend=None):
+        created.append(backend)
+        return HashingEmbeddings()
+    monkeypatch.setattr("second_brain_chat.autotune.get_embeddings", fake_get_embeddings)
+    results, _ = autotune(small_map, max_tokens_grid=(100, 200, 400), k=3, probes=5, embedding_backend="local")
+    assert len(results) == 3
+    assert created == ["local"]
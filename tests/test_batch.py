@@ -0,0 +1,97 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from second_brain_chat.batch import main, read_queries, run_batch, write_results
+from second_brain_chat.mindmap_chat import read_manifest
+from second_brain_chat.shards import build_sharded_index
+
+@pytest.fixture
+def queries_file(tmp_path):
+    path = tmp_path / "queries.jsonl"
+    path.write_text(
+        '{"id": "a", "query": "Child A"}\n'
+        '\n'
+        '{"question": "Grandchild A1"}\n',
+        encoding="utf-8",
+    )
+    return str(path)
+
+@pytest.fixture
+def mock_store():
+    store = MagicMock()
+    store.embeddings.embed_documents.side_effect = lambda texts: [[float(i)] * 4 for i, _ in enumerate(texts)]
+
+    def query(query_embeddings, n_results, include):
+        n = len(query_embeddings)
+        return {
+            "documents": [[f"# Chunk for {int(v[0])}"] for v in query_embeddings],
+            "metadatas": [[{"source": "test.mm"}]] * n,
+            "distances": [[0.1]] * n,
+        }
+    store._collection.query.side_effect = query
+    return store
+
+def test_read_queries(queries_file):
+    queries = read_queries(queries_file)
+    assert queries == [{"id": "a", "query": "Child A"}, {"id": 3, "query": "Grandchild A1"}]
+
+def test_read_queries_rejects_missing_text(tmp_path):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"id": 1}\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_queries(str(path))
+
+def test_run_batch_embeds_once_and_searches_in_batches(mock_store):
+    queries = [{"id": i, "query": f"q{i}"} for i in range(5)]
+
+    results = run_batch(queries, mock_store, top_k=1, search_batch_size=2)
+
+    mock_store.embeddings.embed_documents.assert_called_once_with([f"q{i}" for i in range(5)])
+    assert mock_store._collection.query.call_count == 3
+    assert [r["id"] for r in results] == list(range(5))
+    assert results[4]["results"][0]["content"] == "# Chunk for 4"
+    assert {"embed", "search", "total"} <= set(results[0]["timings_ms"])
+    assert "answer" not in results[0]
+
+def test_run_batch_generates_answers_in_order(mock_store):
+    chain = MagicMock()
+    chain.invoke.side_effect = lambda inputs: MagicMock(content=f"answer to {inputs['input']}")
+    queries = [{"id": i, "query": f"q{i}"} for i in range(6)]
+
+    results = run_batch(queries, mock_store, llm_chain=chain, workers=3)
+
+    assert [r["answer"] for r in results] == [f"answer to q{i}" for i in range(6)]
+    assert chain.invoke.call_count == 6
+    assert "generate" in results[0]["timings_ms"]
+
+def test_run_batch_records_generation_errors(mock_store):
+    chain = MagicMock()
+    chain.invoke.side_effect = RuntimeError("server down")
+
+    results = run_batch([{"id": 1, "query": "q"}], mock_store, llm_chain=chain)
+
+    assert results[0]["error"] == "server down"
+    assert results[0]["results"], "retrieval results should survive a failed generation"
+
+def test_write_results_round_trips(tmp_path):
+    path = tmp_path / "out.jsonl"
+    write_results(str(path), [{"id": 1, "query": "こんにちは"}])
+    assert json.loads(path.read_text(encoding="utf-8").strip()) == {"id": 1, "query": "こんにちは"}
+
+def test_main_queries_sharded_index_without_rebuilding(tmp_path, monkeypatch):
+    mm = tmp_path / "map.mm"
+    mm.write_text('<?xml version="1.0"?><map><node TEXT="Root">'
+                  + "".join(f'<node TEXT="Topic {i}"/>' for i in range(6)) + "</node></map>", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    db_dir = "chroma_db_map.mm"
+    build_sharded_index([str(mm)], db_dir, n_shards=2, by="hash", workers=1, max_tokens=20,
+                        embedding_backend="hashing")
+    queries = tmp_path / "queries.jsonl"
+    queries.write_text('{"id": 1, "query": "Topic 4"}\n', encoding="utf-8")
+
+    main([str(queries), "--mm", str(mm), "--out", "out.jsonl", "-k", "2"])
+
+    assert {"sharding", "shards"} <= set(read_manifest(db_dir))
+    result = json.loads((tmp_path / "out.jsonl").read_text(encoding="utf-8"))
+    assert len(result["results"]) == 2
+    assert result["results"][0]["content"] == "# Topic 4"
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import MagicMock
-from second_brain_chat.memory_chat import run_chat_turn  # Adjust if needed
+import asyncio
+from second_brain_chat.memory_chat import run_chat_turn, stream_chat_turn, astream_chat_turn, StreamStats, reported_output_tokens  # Adjust if needed
 
 @pytest.fixture
 def mock_vectorstore():
@@ -31,3 +32,61 @@ def test_run_chat_turn(mock_vectorstore, mock_llm_chain):
     mock_vectorstore.add_texts.assert_called_once_with([user_input])
     mock_vectorstore.similarity_search.assert_called_once_with(user_input, k=3)
     mock_llm_chain.invoke.assert_called_once()
+
+def test_stream_chat_turn_yields_tokens(mock_vectorstore, mock_llm_chain):
+    # Given
+    mock_llm_chain.stream.return_value = iter([
+        MagicMock(content="Paris"), MagicMock(content=""), MagicMock(content=" is the capital"),
+    ])
+    stats = StreamStats()
+
+    # When
+    pieces = list(stream_chat_turn("Capital of France?", mock_vectorstore, mock_llm_chain, stats))
+
+    # Then
+    assert pieces == ["Paris", " is the capital"]
+    assert stats.tokens > 0
+    assert stats.first_token_s is not None and stats.total_s >= stats.first_token_s
+    mock_vectorstore.add_texts.assert_called_once_with(["Capital of France?"])
+    mock_llm_chain.invoke.assert_not_called()
+
+def test_stream_stats_prefer_server_usage(mock_vectorstore, mock_llm_chain):
+    # Given: the server reports usage on a final, empty chunk
+    mock_llm_chain.stream.return_value = iter([
+        MagicMock(content="Paris"), MagicMock(content=" is the capital"),
+        MagicMock(content="", usage_metadata={"input_tokens": 40, "output_tokens": 7, "total_tokens": 47}),
+    ])
+    stats = StreamStats()
+
+    # When
+    pieces = list(stream_chat_turn("Capital of France?", mock_vectorstore, mock_llm_chain, stats))
+
+    # Then
+    assert pieces == ["Paris", " is the capital"]
+    assert stats.tokens == 7 and stats.from_server
+
+def test_stream_stats_estimate_without_usage(mock_vectorstore, mock_llm_chain):
+    mock_llm_chain.stream.return_value = iter([MagicMock(content="Paris"), MagicMock(content=" is the capital")])
+    stats = StreamStats()
+    list(stream_chat_turn("Capital of France?", mock_vectorstore, mock_llm_chain, stats))
+    assert stats.tokens > 0 and not stats.from_server
+
+def test_reported_output_tokens_reads_openai_token_usage():
+    chunk = MagicMock(content="", usage_metadata=None,
+                      response_metadata={"token_usage": {"completion_tokens": 12, "prompt_tokens": 30}})
+    assert reported_output_tokens(chunk) == 12
+    assert reported_output_tokens(MagicMock(content="hi")) is None
+
+def test_astream_chat_turn_yields_tokens(mock_vectorstore):
+    # Given
+    class AsyncChain:
+        async def astream(self, inputs):
+            for piece in ("Hello", " world"):
+                yield MagicMock(content=piece)
+
+    async def collect():
+        return [p async for p in astream_chat_turn("hi", mock_vectorstore, AsyncChain())]
+
+    # When / Then
+    assert asyncio.run(collect()) == ["Hello", " world"]
+    mock_vectorstore.similarity_search.assert_called_once_with("hi", k=3)
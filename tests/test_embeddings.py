@@ -0,0 +1,92 @@
+import socket
+import threading
+import numpy as np
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from second_brain_chat.embeddings import (
+    EMBED_MODEL, DaemonEmbeddings, EmbeddingDaemonError, EmbeddingModelMismatch,
+    encode_request, encode_response, get_embeddings, read_request, read_response,
+)
+from second_brain_chat.embed_daemon import EmbeddingServer
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "embed.sock")
+
+@pytest.fixture
+def daemon(socket_path):
+    server = EmbeddingServer(socket_path, DeterministicFakeEmbedding(size=16))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_protocol_round_trip():
+    a, b = socket.socketpair()
+    texts = ["hello", "", "こんにちは\nworld"]
+    a.sendall(encode_request(texts, "some-model"))
+    assert read_request(b) == ("some-model", texts)
+
+    vectors = np.arange(6, dtype=np.float32).reshape(3, 2)
+    b.sendall(encode_response(vectors))
+    assert np.array_equal(read_response(a), vectors)
+    a.close()
+    b.close()
+
+def test_client_uses_daemon(daemon, socket_path):
+    fallback_used = []
+    client = DaemonEmbeddings(socket_path, fallback=lambda: fallback_used.append(True))
+    expected = DeterministicFakeEmbedding(size=16)
+
+    vectors = client.embed_documents(["alpha", "beta"])
+    query = client.embed_query("alpha")
+
+    assert np.allclose(vectors, expected.embed_documents(["alpha", "beta"]), atol=1e-6)
+    assert np.allclose(query, vectors[0])
+    assert not fallback_used
+
+def test_concurrent_clients_share_daemon(daemon, socket_path):
+    results = {}
+
+    def worker(i):
+        results[i] = DaemonEmbeddings(socket_path, fallback=False).embed_query(f"text {i}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    expected = DeterministicFakeEmbedding(size=16)
+    assert all(np.allclose(results[i], expected.embed_query(f"text {i}"), atol=1e-6) for i in range(8))
+
+def test_client_falls_back_without_daemon(socket_path):
+    client = DaemonEmbeddings(socket_path, fallback=lambda: DeterministicFakeEmbedding(size=16))
+    assert len(client.embed_query("no daemon here")) == 16
+
+def test_client_without_fallback_raises(socket_path):
+    with pytest.raises(EmbeddingDaemonError):
+        DaemonEmbeddings(socket_path, fallback=False).embed_query("no daemon here")
+
+def test_client_falls_back_when_daemon_serves_another_model(daemon, socket_path):
+    fallback = DeterministicFakeEmbedding(size=8)
+    client = DaemonEmbeddings(socket_path, fallback=lambda: fallback, model_name="other-model")
+    assert client.embed_query("alpha") == fallback.embed_query("alpha")
+    # the mismatch is remembered instead of asking the daemon again
+    assert client._sock is None
+    assert len(client.embed_documents(["beta", "gamma"])) == 2
+
+def test_model_mismatch_without_fallback_raises(daemon, socket_path):
+    client = DaemonEmbeddings(socket_path, fallback=False, model_name="other-model")
+    with pytest.raises(EmbeddingModelMismatch, match=EMBED_MODEL):
+        client.embed_query("alpha")
+    # a matching client on the same daemon is still served
+    assert len(DaemonEmbeddings(socket_path, fallback=False).embed_query("alpha")) == 16
+
+def test_second_daemon_on_same_socket_is_refused(daemon, socket_path):
+    with pytest.raises(EmbeddingDaemonError):
+        EmbeddingServer(socket_path, DeterministicFakeEmbedding(size=16))
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        get_embeddings("quantum")
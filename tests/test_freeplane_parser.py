@@ -2,7 +2,8 @@ import pytest
 import tempfile
 import xml.etree.ElementTree as ET
 import logging
-from second_brain_chat.freeplane_parser import parse_mm, chunk_node, count_tokens, normalize_richcontent, MMParseError
+from second_brain_chat.freeplane_parser import parse_mm, chunk_node, count_tokens, normalize_richcontent, MMParseError, node_to_markdown, RenderProfile, parse_and_chunk
+from second_brain_chat.mapgen import write_map
 
 # Utility to generate a large Freeplane XML string with N children under root
 def generate_large_mm(n=20):
@@ -389,3 +390,76 @@ def test_node_with_no_text_but_richcontent():
         chunks = chunk_node(root, max_tokens=200)
         joined = "\n".join(chunks)
         assert "Backup text" in joined
+
+PROFILE_MM = '''<?xml version="1.0"?>
+<map version="1.0.1">
+    <node TEXT="Root" CREATED="123456" MODIFIED="654321" POSITION="right" LINK="https://example.com">
+        <richcontent TYPE="NOTE"><html><body>A real note</body></html></richcontent>
+        <node TEXT="Echo" COLOR="#ff0000">
+            <richcontent TYPE="NOTE"><html><body>Echo</body></html></richcontent>
+        </node>
+    </node>
+</map>'''
+
+def _parse_string(xml):
+    with tempfile.NamedTemporaryFile(mode="w+", suffix=".mm", delete=False) as tmp:
+        tmp.write(xml)
+        tmp.flush()
+        return parse_mm(tmp.name)
+
+def test_full_profile_is_default():
+    root = _parse_string(PROFILE_MM)
+    assert node_to_markdown(root) == node_to_markdown(root, profile="full")
+    assert "CREATED=123456" in node_to_markdown(root)
+
+def test_lean_profile_drops_layout_attributes_and_dedupes_notes():
+    root = _parse_string(PROFILE_MM)
+    md = node_to_markdown(root, profile="lean")
+    assert "CREATED" not in md and "MODIFIED" not in md and "POSITION" not in md and "COLOR" not in md
+    assert "LINK=https://example.com" in md
+    assert md.count("A real note") == 1, "note should not repeat in the metadata comment"
+    assert "> Note: Echo" not in md, "note identical to the node text should be dropped"
+    assert count_tokens(md) < count_tokens(node_to_markdown(root, profile="full"))
+
+def test_text_only_profile_keeps_headings_and_notes():
+    root = _parse_string(PROFILE_MM)
+    md = node_to_markdown(root, profile="text-only")
+    assert "<!--" not in md
+    assert "# Root" in md and "## Echo" in md
+    assert "> Note: A real note" in md
+
+def test_custom_profile_allow_list():
+    root = _parse_string(PROFILE_MM)
+    md = node_to_markdown(root, profile=RenderProfile("custom", allow=frozenset({"MODIFIED"})))
+    assert "<!-- MODIFIED=654321 -->" in md
+
+def test_chunk_node_threads_profile():
+    root = _parse_string(PROFILE_MM)
+    chunks = chunk_node(root, max_tokens=200, profile="lean")
+    assert not any("CREATED" in c for c in chunks)
+
+def test_unknown_profile_raises():
+    root = _parse_string(PROFILE_MM)
+    with pytest.raises(ValueError):
+        node_to_markdown(root, profile="tiny")
+
+@pytest.mark.parametrize("max_tokens,profile", [(200, "full"), (500, "lean"), (100000, "full")])
+def test_parallel_parse_and_chunk_matches_serial(tmp_path, max_tokens, profile):
+    path = write_map(str(tmp_path / "big.mm"), branches=6, depth=2, fanout=3, note_ratio=0.5)
+    serial_root = parse_mm(path)
+    serial_chunks = chunk_node(serial_root, max_tokens=max_tokens, profile=profile)
+
+    root, chunks = parse_and_chunk(path, max_tokens=max_tokens, profile=profile, workers=2)
+
+    assert root == serial_root
+    assert chunks == serial_chunks
+
+def test_normalize_richcontent_keeps_links_images_then_text_order():
+    rc = ET.fromstring('''<richcontent TYPE="NOTE"><html><body>
+        <p>first <img src="a.png"/> middle <a href="https://x.org">anchor</a> tail</p>
+        <a href="https://y.org"><img src="b.png"/></a>
+    </body></html></richcontent>''')
+    assert normalize_richcontent(rc) == (
+        "[Link: https://x.org] [Link: https://y.org] [Image: a.png] [Image: b.png] "
+        "first middle anchor tail"
+    )
@@ -0,0 +1,66 @@
+import subprocess
+import sys
+import numpy as np
+import pytest
+from second_brain_chat.embeddings import get_embeddings
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mapgen import write_map
+from second_brain_chat.mindmap_chat import build_index, load_index, read_manifest
+
+def test_vectors_are_normalised_and_fixed_size():
+    emb = HashingEmbeddings(n_features=256)
+    vectors = np.array(emb.embed_documents(["project alpha roadmap", "garden plan"]))
+    assert vectors.shape == (2, 256)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert emb.embed_query("") == [0.0] * 256
+    assert emb.embed_documents([]) == []
+
+def test_similar_texts_score_higher():
+    emb = HashingEmbeddings()
+    query = np.array(emb.embed_query("Project Alpha roadmap"))
+    near, far = np.array(emb.embed_documents(["# Project Alpha\n## Roadmap for Q3", "# Cooking\n## Pasta recipes"]))
+    assert query @ near > query @ far + 0.3
+
+def test_hashes_are_stable_across_processes():
+    # Python's hash() is salted per process; ours must not be, or persisted indexes break
+    code = ("from second_brain_chat.hashing_embeddings import HashingEmbeddings;"
+            "print(HashingEmbeddings(n_features=64).embed_query('stable across runs'))")
+    other = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert np.allclose(eval(other.stdout), HashingEmbeddings(n_features=64).embed_query("stable across runs"))
+
+def test_idf_down_weights_common_terms(tmp_path):
+    corpus = ["budget meeting notes", "budget review", "budget plan", "garden compost"]
+    plain = HashingEmbeddings()
+    fitted = HashingEmbeddings().fit(corpus)
+    query = "budget compost"
+    compost = corpus[3]
+    assert (np.dot(fitted.embed_query(query), fitted.embed_query(compost))
+            > np.dot(plain.embed_query(query), plain.embed_query(compost)))
+
+    path = str(tmp_path / "hashing.json")
+    fitted.save(path)
+    assert np.allclose(HashingEmbeddings.load(path).embed_query(query), fitted.embed_query(query))
+
+def test_idf_size_must_match():
+    with pytest.raises(ValueError):
+        HashingEmbeddings(n_features=8, idf=[1.0] * 4)
+
+def test_get_embeddings_hashing_backend():
+    assert isinstance(get_embeddings("hashing"), HashingEmbeddings)
+
+def test_build_and_load_index_with_hashing(tmp_path):
+    mm = write_map(str(tmp_path / "map.mm"), branches=3, depth=2)
+    db_dir = str(tmp_path / "db")
+    store = build_index(mm, db_dir, embedding_backend="hashing")
+    # a heading, not the first line of a chunk that continues a long node
+    title = next(line.lstrip("# ") for doc in store.get()["documents"]
+                 for line in doc.splitlines() if line.startswith("#"))
+
+    manifest = read_manifest(db_dir)
+    assert manifest["embedding"]["backend"] == "hashing"
+
+    # a new process with a different default backend still queries with the index's own
+    loaded = load_index(db_dir)
+    assert isinstance(loaded.embeddings, HashingEmbeddings)
+    assert loaded.embeddings.idf is not None
+    assert any(title in doc.page_content for doc in loaded.similarity_search(title, k=3))
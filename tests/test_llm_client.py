@@ -0,0 +1,196 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import openai
+import pytest
+from unittest.mock import MagicMock
+from second_brain_chat import llm_client
+from second_brain_chat.llm_client import BoundedRunnable, ConcurrencyLimiter, LLMBusyError
+
+def _transient():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://stub/v1/chat/completions"))
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_client, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(llm_client, "HEALTH_CACHE", str(tmp_path / "health.json"))
+    llm_client._health.clear()
+
+def test_limiter_caps_in_flight_requests():
+    limiter = ConcurrencyLimiter(max_in_flight=2, max_queue=10, timeout=5)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class SlowRunnable:
+        def invoke(self, inputs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return inputs["n"]
+
+    chain = BoundedRunnable(SlowRunnable(), limiter=limiter)
+    threads = [threading.Thread(target=chain.invoke, args=({"n": i},)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+    assert limiter.in_flight == 0
+
+def test_limiter_rejects_when_queue_full():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=0, timeout=5)
+    limiter.acquire()
+    with pytest.raises(LLMBusyError):
+        limiter.acquire()
+    limiter.release()
+
+def test_limiter_times_out_waiting_for_slot():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=5, timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(LLMBusyError):
+        limiter.acquire()
+    limiter.release()
+    # the timed-out waiter must not block later callers
+    with limiter.slot():
+        assert limiter.in_flight == 1
+
+def test_async_waiters_are_served_in_order():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=5, timeout=5)
+    order = []
+
+    async def worker(n):
+        async with limiter.aslot():
+            order.append(n)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(worker(n) for n in range(4)))
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3]
+    assert limiter.in_flight == 0
+
+def test_cancelled_async_waiter_does_not_leak_slot():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=5, timeout=5)
+
+    async def main():
+        limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        # the slot is handed over and the waiter cancelled before it gets to run
+        limiter.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.in_flight == 0
+        async with limiter.aslot():
+            assert limiter.in_flight == 1
+    asyncio.run(main())
+    assert limiter.in_flight == 0
+
+def test_async_waiter_times_out():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=5, timeout=0.05)
+    limiter.acquire()
+    with pytest.raises(LLMBusyError):
+        asyncio.run(limiter.aacquire())
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert not limiter._waiters
+
+def test_thread_release_wakes_async_waiter():
+    limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=5, timeout=5)
+    limiter.acquire()
+    threading.Timer(0.02, limiter.release).start()
+
+    async def main():
+        async with limiter.aslot():
+            return limiter.in_flight
+    assert asyncio.run(main()) == 1
+    assert limiter.in_flight == 0
+
+@pytest.fixture
+def stub_server():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like LM Studio
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.server.requests += 1
+            body = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "pong"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_async_requests_work_from_a_fresh_event_loop_each_time(stub_server):
+    llm = llm_client.get_llm(f"http://127.0.0.1:{stub_server.server_port}/v1", streaming=False)
+    # e.g. a caller doing asyncio.run() per request: pooled connections must not cross loops
+    for chain in (llm, llm, llm_client.bounded(llm), llm_client.bounded(llm)):
+        assert asyncio.run(chain.ainvoke("ping")).content == "pong"
+    assert stub_server.requests == 4  # nothing failed and was retried
+
+def test_invoke_retries_transient_errors():
+    runnable = MagicMock()
+    runnable.invoke.side_effect = [_transient(), _transient(), "ok"]
+    chain = BoundedRunnable(runnable, limiter=ConcurrencyLimiter(1, 1, 1), retries=3)
+    assert chain.invoke({"input": "hi"}) == "ok"
+    assert runnable.invoke.call_count == 3
+
+def test_invoke_gives_up_after_retries():
+    runnable = MagicMock()
+    runnable.invoke.side_effect = _transient()
+    chain = BoundedRunnable(runnable, limiter=ConcurrencyLimiter(1, 1, 1), retries=2)
+    with pytest.raises(openai.APIConnectionError):
+        chain.invoke({"input": "hi"})
+    assert runnable.invoke.call_count == 3
+
+def test_stream_not_retried_after_first_chunk():
+    def broken_stream(inputs):
+        yield MagicMock(content="partial")
+        raise _transient()
+
+    runnable = MagicMock()
+    runnable.stream.side_effect = broken_stream
+    limiter = ConcurrencyLimiter(1, 1, 1)
+    chain = BoundedRunnable(runnable, limiter=limiter, retries=3)
+    with pytest.raises(openai.APIConnectionError):
+        list(chain.stream({"input": "hi"}))
+    assert runnable.stream.call_count == 1
+    assert limiter.in_flight == 0
+
+def test_health_is_cached_between_calls(monkeypatch):
+    probe = MagicMock(return_value=True)
+    monkeypatch.setattr(llm_client, "_probe", probe)
+    assert llm_client.check_health("http://stub/v1")
+    llm_client._health.clear()  # simulate a fresh process: only the on-disk cache remains
+    assert llm_client.check_health("http://stub/v1")
+    assert probe.call_count == 1
+
+def test_failed_health_probe_is_not_cached(monkeypatch):
+    probe = MagicMock(side_effect=[False, True])
+    monkeypatch.setattr(llm_client, "_probe", probe)
+    assert not llm_client.check_health("http://stub/v1")
+    assert llm_client.check_health("http://stub/v1")
+    assert probe.call_count == 2
@@ -0,0 +1,106 @@
+import json
+import os
+import time
+from unittest.mock import MagicMock
+from second_brain_chat.memory_store import CHECKPOINT_NAME, DurableMemoryStore, WAL_NAME
+
+def _store(path, vectorstore, **kwargs):
+    opts = dict(batch_size=4, flush_interval=0.05, fsync=False)
+    opts.update(kwargs)
+    return DurableMemoryStore(str(path), vectorstore=vectorstore, **opts)
+
+def _crash(store):
+    # the process dies before the background commit runs: stop the commit thread for
+    # good, failing the one commit it attempts on the way out, so nothing writes later
+    store.vectorstore.add_texts.side_effect = RuntimeError("process died")
+    with store._cond:
+        store._stopping = True
+        store._cond.notify_all()
+    store._thread.join(5)
+    assert not store._thread.is_alive()
+    store._wal.close()
+
+def _committed_texts(vectorstore):
+    return [t for call in vectorstore.add_texts.call_args_list for t in call.args[0]]
+
+def test_add_texts_returns_before_commit_and_group_commits(tmp_path):
+    vs = MagicMock()
+    store = _store(tmp_path, vs, batch_size=4, flush_interval=60)
+
+    for i in range(8):
+        store.add_texts([f"turn {i}"])
+    assert store.flush(timeout=5)
+
+    assert _committed_texts(vs) == [f"turn {i}" for i in range(8)]
+    assert vs.add_texts.call_count == 2, "expected two batches of four"
+    ids = [i for call in vs.add_texts.call_args_list for i in call.kwargs["ids"]]
+    assert ids == [f"memory-{i}" for i in range(1, 9)]
+    store.close()
+
+def test_small_batches_commit_after_interval(tmp_path):
+    vs = MagicMock()
+    store = _store(tmp_path, vs, batch_size=100, flush_interval=0.05)
+    store.add_texts(["lonely turn"])
+    deadline = time.monotonic() + 5
+    while store.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _committed_texts(vs) == ["lonely turn"]
+    store.close()
+
+def test_uncommitted_tail_is_replayed_after_crash(tmp_path):
+    crashed = _store(tmp_path, MagicMock(), batch_size=100, flush_interval=60)
+    crashed.add_texts(["remember me", "and me"])
+    _crash(crashed)
+    assert not os.path.exists(os.path.join(tmp_path, CHECKPOINT_NAME))
+
+    vs = MagicMock()
+    store = _store(tmp_path, vs)
+    assert store.flush(timeout=5)
+    assert _committed_texts(vs) == ["remember me", "and me"]
+    store.close()
+
+def test_committed_entries_are_not_replayed(tmp_path):
+    vs = MagicMock()
+    store = _store(tmp_path, vs)
+    store.add_texts(["already indexed"])
+    store.close()
+
+    vs2 = MagicMock()
+    reopened = _store(tmp_path, vs2)
+    ids = reopened.add_texts(["new"])
+    assert reopened.flush(timeout=5)
+    assert _committed_texts(vs2) == ["new"]
+    assert ids == ["memory-2"], "sequence numbers continue across restarts"
+    reopened.close()
+
+def test_torn_log_tail_is_discarded(tmp_path):
+    store = _store(tmp_path, MagicMock(), batch_size=100, flush_interval=60)
+    store.add_texts(["whole"])
+    _crash(store)
+    with open(os.path.join(tmp_path, WAL_NAME), "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "text": "half wri')
+
+    vs = MagicMock()
+    reopened = _store(tmp_path, vs)
+    assert reopened.flush(timeout=5)
+    assert _committed_texts(vs) == ["whole"]
+    with open(os.path.join(tmp_path, WAL_NAME), encoding="utf-8") as f:
+        assert all(json.loads(line) for line in f)
+    reopened.close()
+
+def test_failed_commit_is_retried(tmp_path):
+    vs = MagicMock()
+    vs.add_texts.side_effect = [RuntimeError("disk full"), None]
+    store = _store(tmp_path, vs)
+    store.add_texts(["retry me"])
+    assert store.flush(timeout=5)
+    assert vs.add_texts.call_count == 2
+    store.close()
+
+def test_search_is_delegated(tmp_path):
+    vs = MagicMock()
+    vs.similarity_search.return_value = ["doc"]
+    store = _store(tmp_path, vs)
+    assert store.similarity_search("query", k=3) == ["doc"]
+    vs.similarity_search.assert_called_once_with("query", k=3)
+    store.close()
@@ -0,0 +1,94 @@
+import pytest
+from langchain.prompts import ChatPromptTemplate
+from second_brain_chat.freeplane_parser import parse_mm, chunk_node
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mapgen import write_map
+from second_brain_chat.memory_chat import chat_memory, run_chat_turn
+from second_brain_chat.memory_store import DurableMemoryStore
+from second_brain_chat.memprofile import MB, StageResult, measure, profile_pipeline, stub_llm
+from second_brain_chat.mindmap_chat import build_index, load_index
+
+# Budgets are for the generated map below (20 branches x depth 3 = 1700 nodes) and sit
+# at roughly 5-10x today's usage: loose enough for other platforms, tight enough to
+# catch a stage that starts holding on to the whole map or every turn.
+
+@pytest.fixture(scope="module")
+def generated_map(tmp_path_factory):
+    return write_map(str(tmp_path_factory.mktemp("maps") / "generated.mm"), branches=20, depth=3)
+
+@pytest.fixture(scope="module")
+def parsed_map(generated_map):
+    return parse_mm(generated_map)
+
+def test_measure_separates_peak_from_retained():
+    with measure("alloc") as stage:
+        kept = bytearray(4 * MB)
+        scratch = bytearray(8 * MB)
+        del scratch
+    assert stage.peak_bytes >= 12 * MB
+    assert 4 * MB <= stage.retained_bytes < 6 * MB
+    assert stage.rss_peak >= stage.rss_before
+    assert len(kept) == 4 * MB
+
+def test_over_budget_reports_each_violation():
+    stage = StageResult("build_index", peak_bytes=30 * MB, retained_bytes=2 * MB, rss_before=0, rss_peak=100 * MB)
+    assert stage.over_budget(peak_mb=50, retained_mb=5) == []
+    violations = stage.over_budget(peak_mb=20, retained_mb=1, rss_mb=200)
+    assert len(violations) == 2
+    assert violations[0].startswith("build_index: peak 30.0 MiB")
+
+@pytest.mark.memory_budget(peak_mb=10, retained_mb=5)
+def test_parse_mm_budget(generated_map):
+    root = parse_mm(generated_map)
+    assert len(root.children) == 20
+
+@pytest.mark.memory_budget(peak_mb=10, retained_mb=3)
+def test_chunk_node_budget(parsed_map):
+    assert chunk_node(parsed_map, max_tokens=500, profile="lean")
+
+@pytest.fixture
+def index_dir(tmp_path):
+    # a throwaway build first, so Chroma's one-time imports and client setup aren't counted
+    build_index(write_map(str(tmp_path / "warm-up.mm"), branches=2, depth=1), str(tmp_path / "warm-up"),
+                embedding_backend="hashing")
+    return str(tmp_path / "db")
+
+@pytest.mark.memory_budget(peak_mb=150, retained_mb=25)
+def test_build_index_budget(generated_map, index_dir):
+    store = build_index(generated_map, index_dir, embedding_backend="hashing")
+    assert store._collection.count() > 0
+
+@pytest.fixture(scope="module")
+def built_index(generated_map, tmp_path_factory):
+    db_dir = str(tmp_path_factory.mktemp("index") / "db")
+    build_index(generated_map, db_dir, embedding_backend="hashing")
+    return db_dir
+
+@pytest.mark.memory_budget(peak_mb=20, retained_mb=5)
+def test_load_index_budget(built_index):
+    assert load_index(built_index).similarity_search("Project", k=3)
+
+@pytest.fixture
+def memory(tmp_path):
+    store = DurableMemoryStore(str(tmp_path), HashingEmbeddings(), flush_interval=0.01, fsync=False)
+    store.add_texts(["warm-up"])  # first write creates the collection; not per-turn cost
+    store.flush()
+    yield store
+    store.close()
+
+@pytest.mark.memory_budget(retained_mb=5)
+def test_chat_turns_budget(memory):
+    prompt = ChatPromptTemplate.from_messages([("human", "{input}\n\n{context}")])
+    for i in range(20):
+        assert run_chat_turn(f"turn {i} about project {i % 5}", memory, prompt | stub_llm()) == "noted."
+    assert memory.flush(timeout=30)
+
+def test_chat_memory_log_is_bounded():
+    assert chat_memory.maxlen is not None
+
+def test_profile_pipeline_reports_every_stage(tmp_path):
+    mm = write_map(str(tmp_path / "small.mm"), branches=3, depth=2)
+    results = profile_pipeline(mm, turns=3, db_dir=str(tmp_path / "db"), memory_dir=str(tmp_path / "memory"))
+    assert [r.name for r in results] == ["parse_mm", "chunk_node", "build_index", "load_index", "chat_turns x3"]
+    assert all(r.seconds > 0 and r.rss_peak > 0 for r in results)
+    assert results[1].extra["chunks"] > 0
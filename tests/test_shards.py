@@ -0,0 +1,105 @@
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from second_brain_chat.hashing_embeddings import HashingEmbeddings
+from second_brain_chat.mindmap_chat import HASHING_STATE, read_manifest, write_manifest
+from second_brain_chat.shards import ShardedIndex, build_sharded_index, rebuild_shard, shard_of
+
+def fake_embeddings():
+    return DeterministicFakeEmbedding(size=32)
+
+def _write(path, children):
+    nodes = "".join(f'<node TEXT="{c}"/>' for c in children)
+    path.write_text(f'<?xml version="1.0"?><map><node TEXT="Root">{nodes}</node></map>', encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def maps(tmp_path):
+    return [
+        _write(tmp_path / "alpha.mm", [f"Alpha {i}" for i in range(5)]),
+        _write(tmp_path / "beta.mm", [f"Beta {i}" for i in range(5)]),
+        _write(tmp_path / "gamma.mm", [f"Gamma {i}" for i in range(5)]),
+    ]
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("a.mm", "", 4) == shard_of("a.mm", "other chunk", 4)
+    assert all(0 <= shard_of("x", f"chunk {i}", 3, by="hash") < 3 for i in range(50))
+
+@pytest.mark.parametrize("by", ["source", "hash"])
+def test_build_writes_manifest_and_covers_all_chunks(maps, tmp_path, by):
+    db = str(tmp_path / f"db_{by}")
+    build_sharded_index(maps, db, n_shards=3, by=by, workers=1, max_tokens=20,
+                        embedding_factory=fake_embeddings)
+    manifest = read_manifest(db)
+    assert manifest["sharding"] == {"n_shards": 3, "by": by}
+    assert set(manifest["sources"]) == {"alpha.mm", "beta.mm", "gamma.mm"}
+    assert sum(s["chunks"] for s in manifest["shards"].values()) == 15
+    if by == "source":
+        assert all(len(s["sources"]) == 1 for s in manifest["shards"].values() if s["chunks"])
+
+def test_query_merges_results_across_shards(maps, tmp_path):
+    db = str(tmp_path / "db")
+    build_sharded_index(maps, db, n_shards=3, by="hash", workers=1, max_tokens=20,
+                        embedding_factory=fake_embeddings)
+    index = ShardedIndex(db, embedding=fake_embeddings())
+    hits = index.similarity_search_with_score("# Beta 3", k=4)
+    assert hits[0][0].page_content == "# Beta 3"
+    assert len(hits) == 4
+    assert [d for _, d in hits] == sorted(d for _, d in hits)
+
+def test_rebuild_single_shard_leaves_others_untouched(maps, tmp_path):
+    db = str(tmp_path / "db")
+    build_sharded_index(maps, db, n_shards=3, by="source", workers=1, max_tokens=20,
+                        embedding_factory=fake_embeddings)
+    before = read_manifest(db)["shards"]
+    target = shard_of("beta.mm", "", 3)
+    # small enough to become a single chunk
+    _write(tmp_path / "beta.mm", ["Beta only"])
+
+    rebuild_shard(db, target, embedding_factory=fake_embeddings)
+
+    after = read_manifest(db)["shards"]
+    others = sum(5 for name in ("alpha.mm", "gamma.mm") if shard_of(name, "", 3) == target)
+    assert after[str(target)]["chunks"] == 1 + others
+    for sid, info in before.items():
+        if int(sid) != target:
+            assert after[sid] == info
+    hits = ShardedIndex(db, embedding=fake_embeddings()).similarity_search("# Root\n## Beta only", k=1)
+    assert hits[0].page_content == "# Root\n## Beta only"
+
+def test_chunks_carry_the_same_metadata_as_a_single_index(maps, tmp_path):
+    index = build_sharded_index(maps, str(tmp_path / "db"), n_shards=2, workers=1, max_tokens=20,
+                                embedding_factory=fake_embeddings)
+    hits = index.similarity_search("# Alpha 1", k=3, filter={"kind": "chunk"})
+    assert len(hits) == 3
+    assert all(d.metadata == {"source": d.metadata["source"], "render_profile": "full", "kind": "chunk"}
+               for d in hits)
+
+def test_rejects_unknown_partitioning(maps, tmp_path):
+    with pytest.raises(ValueError):
+        build_sharded_index(maps, str(tmp_path / "db"), by="random", embedding_factory=fake_embeddings)
+
+def test_build_uses_tuned_chunking_and_keeps_autotune(maps, tmp_path):
+    db = str(tmp_path / "db")
+    autotune = {"k": 3, "recommended": {"max_tokens": 20, "profile": "lean"}}
+    write_manifest(db, {"chunking": {"max_tokens": 500, "profile": "full"}, "autotune": autotune})
+    build_sharded_index(maps, db, n_shards=2, workers=1, embedding_factory=fake_embeddings)
+    manifest = read_manifest(db)
+    assert manifest["chunking"] == {"max_tokens": 20, "profile": "lean"}
+    assert manifest["autotune"] == autotune
+    assert sum(s["chunks"] for s in manifest["shards"].values()) == 15
+
+def test_recorded_backend_is_used_for_queries_and_rebuilds(maps, tmp_path, monkeypatch):
+    db = str(tmp_path / "db")
+    build_sharded_index(maps, db, n_shards=2, by="hash", workers=1, max_tokens=20, embedding_backend="hashing")
+    manifest = read_manifest(db)
+    assert manifest["embedding"] == {"backend": "hashing", "state": HASHING_STATE}
+
+    # a different default at query time must not change the embedder
+    monkeypatch.setenv("EMBED_BACKEND", "local")
+    index = ShardedIndex(db)
+    assert isinstance(index.embeddings, HashingEmbeddings)
+    assert index.embeddings.idf is not None
+    assert index.similarity_search("# Gamma 2", k=1)[0].page_content == "# Gamma 2"
+
+    rebuild_shard(db, 0)
+    assert ShardedIndex(db).similarity_search("# Alpha 1", k=1)[0].page_content == "# Alpha 1"
@@ -0,0 +1,95 @@
+import threading
+import pytest
+from langchain.schema import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import Chroma
+from second_brain_chat.freeplane_parser import Node
+from second_brain_chat.summaries import search_summaries, summarize_tree, summary_documents
+
+class StubLLM:
+    """Answers with the branch title and records every prompt it sees."""
+    def __init__(self):
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.runnable = RunnableLambda(self._reply)
+
+    def _reply(self, prompt):
+        text = prompt.to_string()
+        with self.lock:
+            self.prompts.append(text)
+        title = text.split("Branch: ", 1)[1].split("\n", 1)[0]
+        return AIMessage(content=f"summary of {title}")
+
+def _tree(leaf_text="Leaf A1"):
+    return Node(id="root", text="Root", metadata={}, children=[
+        Node(id="a", text="Branch A", metadata={"notes": "about A"}, children=[
+            Node(id="a1", text=leaf_text, metadata={}, children=[]),
+            Node(id="a2", text="Leaf A2", metadata={}, children=[]),
+        ]),
+        Node(id="b", text="Branch B", metadata={}, children=[
+            Node(id="b1", text="Leaf B1", metadata={}, children=[]),
+        ]),
+    ])
+
+@pytest.fixture
+def stub_llm():
+    return StubLLM()
+
+def test_every_branch_summarised_bottom_up(stub_llm):
+    summaries = summarize_tree(_tree(), llm=stub_llm.runnable)
+
+    assert [s.node_id for s in summaries] == ["root", "a", "b"]
+    assert len(stub_llm.prompts) == 3
+    root_prompt = next(p for p in stub_llm.prompts if "Branch: Root" in p)
+    # the parent sees its children's summaries, not their raw subtrees
+    assert "- Branch A: summary of Branch A" in root_prompt
+    assert "Leaf A1" not in root_prompt
+    a_prompt = next(p for p in stub_llm.prompts if "Branch: Branch A" in p)
+    assert "Note: about A" in a_prompt and "- Leaf A1" in a_prompt
+
+def test_cache_resummarises_only_changed_path(stub_llm):
+    cache = {}
+    first = summarize_tree(_tree(), llm=stub_llm.runnable, cache=cache)
+    stub_llm.prompts.clear()
+
+    second = summarize_tree(_tree(leaf_text="Leaf A1 (edited)"), llm=stub_llm.runnable, cache=cache)
+
+    assert sorted(p.split("Branch: ")[1].split("\n")[0] for p in stub_llm.prompts) == ["Branch A", "Root"]
+    hashes = {s.node_id: s.subtree_hash for s in first}
+    assert {s.node_id for s in second if s.subtree_hash != hashes[s.node_id]} == {"root", "a"}
+
+    stub_llm.prompts.clear()
+    summarize_tree(_tree(leaf_text="Leaf A1 (edited)"), llm=stub_llm.runnable, cache=cache)
+    assert stub_llm.prompts == []
+
+def test_summary_documents_are_searchable_separately(stub_llm):
+    docs = summary_documents(summarize_tree(_tree(), llm=stub_llm.runnable), "test.mm")
+    assert docs[1].metadata["path"] == "Root > Branch A"
+    assert docs[1].metadata["depth"] == 2
+    assert all(d.metadata["kind"] == "summary" for d in docs)
+
+    store = Chroma(collection_name="test_summaries", embedding_function=DeterministicFakeEmbedding(size=32))
+    store.add_texts(["# Root\n## Leaf A1"], metadatas=[{"kind": "chunk"}])
+    store.add_documents(docs)
+    results = search_summaries(store, "what is branch B about?", top_k=10)
+    assert len(results) == 3
+    assert all(r.metadata["kind"] == "summary" for r in results)
+
+def test_search_summaries_on_sharded_index(tmp_path):
+    from second_brain_chat.shards import build_sharded_index
+    mm = tmp_path / "map.mm"
+    mm.write_text('<?xml version="1.0"?><map><node TEXT="Root"><node TEXT="Alpha"/><node TEXT="Beta"/></node></map>',
+                  encoding="utf-8")
+    index = build_sharded_index([str(mm)], str(tmp_path / "db"), n_shards=2, by="hash", workers=1,
+                                max_tokens=5, embedding_backend="hashing")
+    # chunks only: nothing matches the filter, but the filter is applied rather than rejected
+    assert search_summaries(index, "what is this map about?") == []
+    assert index.similarity_search("Alpha", k=1, filter={"kind": "summary"}) == []
+
+def test_cli_rejects_summaries_with_shards(monkeypatch, capsys):
+    from second_brain_chat import mindmap_chat
+    monkeypatch.setattr("sys.argv", ["mindmap_chat", "map.mm", "--summaries", "--shards", "2"])
+    with pytest.raises(SystemExit):
+        mindmap_chat.main()
+    assert "--summaries is not supported with --shards" in capsys.readouterr().err